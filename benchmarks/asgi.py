@@ -0,0 +1,252 @@
+"""
+WSGI и ASGI при одинаковом числе потоков Django.
+
+Скрипт создаёт временную базу SQLite, заполняет её через
+posts.transfer и гоняет страницы постов, профилей и главную двумя
+способами, оба с --workers потоками:
+
+* WSGI: поток обрабатывает запрос и сам отдаёт ответ клиенту, как
+  синхронный сервер, который пишет в сокет;
+* ASGI: yatube.asgi выполняет Django в пуле потоков, а ответ отдаёт
+  цикл событий.
+
+--slow клиентов читают ответ со скоростью --slow-rate байт/с,
+--fast клиентов — мгновенно. В отчёт попадают запросы в секунду
+и перцентили времени ответа быстрых клиентов: при WSGI медленные
+клиенты занимают потоки, при ASGI — нет. Запросы к базе получают
+искусственную задержку --db-latency мс, как у серверной базы в сети.
+
+Отдельно замеряется страница поста с параллельными выборками
+posts.concurrent (VIEW_LOOKUP_THREADS) и без них.
+
+Запуск из корня репозитория:
+    python benchmarks/asgi.py --workers 4 --slow 16 --fast 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+TMP_DIR = tempfile.mkdtemp()
+settings.DATABASES['default']['NAME'] = os.path.join(TMP_DIR, 'bench.sqlite3')
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+settings.DEBUG = False
+settings.ALLOWED_HOSTS = ['*']
+settings.SLOW_QUERY_THRESHOLD_MS = None
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connections, transaction  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts import transfer  # noqa: E402
+from posts.models import Post  # noqa: E402
+from yatube.asgi import WsgiToAsgi, wsgi_environ  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--slow', type=int, default=16,
+                        help='Медленных клиентов')
+    parser.add_argument('--fast', type=int, default=4,
+                        help='Быстрых клиентов')
+    parser.add_argument('--slow-rate', type=int, default=50000,
+                        help='Скорость медленного клиента, байт/с')
+    parser.add_argument('--db-latency', type=float, default=1,
+                        help='Задержка запроса к базе, мс')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--output', help='Файл отчёта JSON')
+    return parser.parse_args()
+
+
+def dataset(posts):
+    for pk in range(1, posts + 1):
+        yield {'model': 'post', 'id': pk, 'text': f'Текст поста {pk} ' * 20,
+               'author': f'user{pk % 50}'}
+        for number in range(5):
+            yield {'model': 'comment', 'post': pk, 'text': 'Комментарий',
+                   'author': f'user{(pk + number) % 50}'}
+
+
+def build(options):
+    call_command('migrate', verbosity=0)
+    with transaction.atomic():
+        transfer.Importer().run(dataset(options.posts))
+    for command in ('rebuild_counters', 'rebuild_timelines'):
+        call_command(command, stdout=open(os.devnull, 'w'))
+    posts = Post.objects.select_related('author').order_by('pk')[:50]
+    post_urls = [reverse('post', args=[post.author.username, post.pk])
+                 for post in posts]
+    urls = [reverse('index'), *post_urls]
+    urls += [reverse('profile', args=[post.author.username])
+             for post in posts[:10]]
+    connections.close_all()
+    return urls, post_urls
+
+
+def add_latency(latency):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+
+
+def scope(url):
+    return {'type': 'http', 'method': 'GET', 'path': url,
+            'query_string': b'', 'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 5000), 'server': ('localhost', 80)}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def summary(fast, slow, elapsed):
+    fast = fast or [0]
+    return {
+        'fast_rps': round(len(fast) / elapsed, 1),
+        'fast_p50_ms': round(statistics.median(fast), 1),
+        'fast_p95_ms': round(percentile(fast, 95), 1),
+        'slow_rps': round(slow / elapsed, 1),
+    }
+
+
+def run_wsgi(options, urls):
+    """Синхронный сервер: поток занят, пока клиент не дочитал ответ."""
+    application = get_wsgi_application()
+    executor = ThreadPoolExecutor(options.workers)
+    deadline = time.perf_counter() + options.seconds
+    fast, slow, lock = [], [0], threading.Lock()
+
+    def handle(url, is_slow):
+        body = b''.join(application(wsgi_environ(scope(url), b''),
+                                    lambda status, headers: None))
+        if is_slow:
+            time.sleep(len(body) / options.slow_rate)
+        return body
+
+    def client(number, is_slow):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            executor.submit(handle, urls[number % len(urls)],
+                            is_slow).result()
+            number += 1
+            with lock:
+                if is_slow:
+                    slow[0] += 1
+                else:
+                    fast.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i, i < options.slow))
+               for i in range(options.slow + options.fast)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    executor.shutdown()
+    return summary(fast, slow[0], time.perf_counter() - started)
+
+
+def run_asgi(options, urls):
+    """yatube.asgi: ответ медленному клиенту отдаёт цикл событий."""
+    application = WsgiToAsgi(get_wsgi_application(), options.workers)
+    fast, slow = [], [0]
+
+    async def request(url, is_slow):
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if is_slow and message['type'] == 'http.response.body':
+                await asyncio.sleep(len(message['body'])
+                                    / options.slow_rate)
+
+        await application(scope(url), receive, send)
+
+    async def client(number, is_slow, deadline):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await request(urls[number % len(urls)], is_slow)
+            number += 1
+            if is_slow:
+                slow[0] += 1
+            else:
+                fast.append((time.perf_counter() - started) * 1000)
+
+    async def main():
+        deadline = time.perf_counter() + options.seconds
+        await asyncio.gather(*(client(i, i < options.slow, deadline)
+                               for i in range(options.slow + options.fast)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    application.executor.shutdown()
+    return summary(fast, slow[0], time.perf_counter() - started)
+
+
+def run_lookups(post_urls, threads, requests=200):
+    """Время страницы поста одним клиентом."""
+    settings.VIEW_LOOKUP_THREADS = threads
+    application = get_wsgi_application()
+    timings = []
+    for number in range(requests):
+        started = time.perf_counter()
+        b''.join(application(
+            wsgi_environ(scope(post_urls[number % len(post_urls)]), b''),
+            lambda status, headers: None))
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2)}
+
+
+def main():
+    options = parse_args()
+    urls, post_urls = build(options)
+    add_latency(options.db_latency / 1000)
+    threads = settings.VIEW_LOOKUP_THREADS
+    report = {
+        'django': django.get_version(),
+        'options': vars(options),
+        'servers': {
+            'wsgi': run_wsgi(options, urls),
+            'asgi': run_asgi(options, urls),
+        },
+        'post_view': {
+            'sequential': run_lookups(post_urls, 0),
+            'concurrent': run_lookups(post_urls, threads),
+        },
+    }
+    if options.output:
+        with open(options.output, 'w') as stream:
+            json.dump(report, stream, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Чтение SQLite под нагрузкой записи: настройки default и production.
+
+Скрипт создаёт временную базу и заполняет её через posts.transfer.
+Для каждого набора из SQLITE_PRESETS на свежей копии базы
+--writers потоков пишут комментарии и подписываются или отписываются,
+а --readers потоков открывают страницы постов и профилей тестовым
+клиентом. Кэш отключён, чтобы каждое чтение шло в базу. В отчёт
+попадают чтения и записи в секунду, перцентили времени чтения
+и число ошибок «database is locked».
+
+Запуск из корня репозитория:
+    python benchmarks/concurrency.py --seconds 10 --readers 4 --writers 2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+TMP_DIR = tempfile.mkdtemp()
+BASE_DB = os.path.join(TMP_DIR, 'base.sqlite3')
+settings.DATABASES['default']['NAME'] = BASE_DB
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+settings.DEBUG = False
+# под нагрузкой потоков медленным выглядит почти каждый запрос
+settings.SLOW_QUERY_THRESHOLD_MS = None
+settings.SQLITE = settings.SQLITE_PRESETS['default']
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import (IntegrityError, OperationalError,  # noqa: E402
+                       connections, transaction)
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts import transfer  # noqa: E402
+from posts.models import Comment, Follow, Post, User  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--output', help='Файл отчёта JSON')
+    return parser.parse_args()
+
+
+def dataset(options):
+    for pk in range(1, options.posts + 1):
+        yield {'model': 'post', 'id': pk, 'text': f'Текст поста {pk}',
+               'author': f'user{pk % options.users}'}
+        yield {'model': 'comment', 'post': pk, 'text': 'Комментарий',
+               'author': f'user{(pk + 1) % options.users}'}
+
+
+def build(options):
+    call_command('migrate', verbosity=0)
+    with transaction.atomic():
+        transfer.Importer().run(dataset(options))
+    for command in ('rebuild_counters', 'rebuild_timelines',
+                    'rebuild_search_index'):
+        call_command(command, stdout=open(os.devnull, 'w'))
+    connections.close_all()
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = []
+        self.writes = 0
+        self.locked = 0
+
+    def add(self, name, value=1):
+        with self.lock:
+            if name == 'reads':
+                self.reads.append(value)
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+
+def reader(stop, stats, urls, seed):
+    rng = random.Random(seed)
+    client = Client()
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                client.get(rng.choice(urls))
+            except OperationalError:
+                stats.add('locked')
+                continue
+            stats.add('reads', (time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+
+
+def write(rng, users, posts):
+    if rng.random() < 0.5:
+        Comment.objects.create(post_id=rng.choice(posts), text='Ответ',
+                               author_id=rng.choice(users))
+        return
+    user, author = rng.sample(users, 2)
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user_id=user,
+                                           author_id=author).delete()
+        if not deleted:
+            Follow.objects.create(user_id=user, author_id=author)
+
+
+def writer(stop, stats, users, posts, seed):
+    rng = random.Random(seed)
+    try:
+        while not stop.is_set():
+            try:
+                write(rng, users, posts)
+            except OperationalError:
+                stats.add('locked')
+            except IntegrityError:
+                pass
+            else:
+                stats.add('writes')
+    finally:
+        connections.close_all()
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def run(options, mode, urls, users, posts):
+    path = os.path.join(TMP_DIR, f'{mode}.sqlite3')
+    shutil.copy(BASE_DB, path)
+    settings.DATABASES['default']['NAME'] = path
+    settings.SQLITE = settings.SQLITE_PRESETS[mode]
+    stats, stop = Stats(), threading.Event()
+    threads = [threading.Thread(target=reader, args=(stop, stats, urls, i))
+               for i in range(options.readers)]
+    threads += [threading.Thread(target=writer,
+                                 args=(stop, stats, users, posts, i))
+                for i in range(options.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(options.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    reads = stats.reads or [0]
+    return {
+        'reads_per_second': round(len(stats.reads) / elapsed, 1),
+        'writes_per_second': round(stats.writes / elapsed, 1),
+        'read_p50_ms': round(statistics.median(reads), 2),
+        'read_p95_ms': round(percentile(reads, 95), 2),
+        'read_p99_ms': round(percentile(reads, 99), 2),
+        'database_locked': stats.locked,
+    }
+
+
+def main():
+    options = parse_args()
+    setup_test_environment()
+    build(options)
+    users = list(User.objects.values_list('pk', flat=True))
+    posts = list(Post.objects.values_list('pk', flat=True))
+    sample = Post.objects.select_related('author').order_by('?')[:200]
+    urls = [reverse('post', args=[post.author.username, post.pk])
+            for post in sample]
+    urls += [reverse('profile', args=[post.author.username])
+             for post in sample[:50]]
+    connections.close_all()
+    report = {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'django': django.get_version(),
+        'options': vars(options),
+        'modes': {},
+    }
+    for mode in settings.SQLITE_PRESETS:
+        report['modes'][mode] = run(options, mode, urls, users, posts)
+        print(mode, report['modes'][mode], file=sys.stderr)
+    if options.output:
+        with open(options.output, 'w') as stream:
+            json.dump(report, stream, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Скорость import_posts на временной базе SQLite.
+
+Запуск из корня репозитория:
+    python benchmarks/import_posts.py [число постов]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+TMP_DIR = tempfile.mkdtemp()
+settings.DATABASES['default']['NAME'] = os.path.join(TMP_DIR, 'bench.sqlite3')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+AUTHORS = 1000
+COMMENTS_PER_POST = 1
+REBUILD_COMMANDS = ('rebuild_counters', 'rebuild_timelines',
+                    'rebuild_search_index')
+
+
+def write_data(path, posts):
+    with open(path, 'w', encoding='utf-8') as stream:
+        for i in range(10):
+            stream.write(json.dumps({
+                'model': 'group', 'title': f'Группа {i}',
+                'slug': f'group-{i}', 'description': ''}) + '\n')
+        for i in range(1, posts + 1):
+            stream.write(json.dumps({
+                'model': 'post', 'id': i, 'text': f'Текст поста номер {i}',
+                'pub_date': '2020-01-01T00:00:00+00:00',
+                'author': f'user{i % AUTHORS}',
+                'group': f'group-{i % 10}'}, ensure_ascii=False) + '\n')
+        for i in range(1, posts + 1):
+            for _ in range(COMMENTS_PER_POST):
+                stream.write(json.dumps({
+                    'model': 'comment', 'post': i, 'text': 'Комментарий',
+                    'author': f'user{(i + 1) % AUTHORS}'},
+                    ensure_ascii=False) + '\n')
+        for i in range(AUTHORS):
+            stream.write(json.dumps({
+                'model': 'follow', 'user': f'user{i}',
+                'author': f'user{(i + 1) % AUTHORS}'}) + '\n')
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    call_command('migrate', verbosity=0)
+    path = os.path.join(TMP_DIR, 'data.jsonl')
+    write_data(path, posts)
+    started = time.perf_counter()
+    call_command('import_posts', path, '--no-rebuild', stdout=sys.stderr)
+    imported = time.perf_counter()
+    print(f'posts: {posts}')
+    print(f'import: {imported - started:.1f} s '
+          f'({posts / (imported - started):.0f} posts/s)')
+    for command in REBUILD_COMMANDS:
+        started = time.perf_counter()
+        call_command(command, stdout=sys.stderr)
+        print(f'{command}: {time.perf_counter() - started:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
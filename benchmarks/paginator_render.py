@@ -0,0 +1,42 @@
+"""
+Время рендера includes/paginator.html в зависимости от числа страниц.
+
+Запуск из корня репозитория:
+    python benchmarks/paginator_render.py
+"""
+import os
+import sys
+import timeit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.template.loader import render_to_string  # noqa: E402
+
+from posts.paginator import FeedPaginator  # noqa: E402
+
+PAGE_COUNTS = (10, 100, 1000, 10000, 50000)
+REPEAT = 200
+
+
+def main():
+    print(f'{"pages":>8} {"ms/render":>10} {"html bytes":>11}')
+    for num_pages in PAGE_COUNTS:
+        paginator = FeedPaginator(range(num_pages * 10), 10)
+        page = paginator.get_page(num_pages // 2)
+        context = {'page': page}
+        html = render_to_string('includes/paginator.html', context)
+        seconds = timeit.timeit(
+            lambda: render_to_string('includes/paginator.html', context),
+            number=REPEAT)
+        print(f'{num_pages:>8} {seconds / REPEAT * 1000:>10.3f} '
+              f'{len(html.encode()):>11}')
+
+
+if __name__ == '__main__':
+    main()
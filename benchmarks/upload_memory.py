@@ -0,0 +1,72 @@
+"""
+Пиковая память на приём картинки поста: ImageUploadHandler против
+стандартных обработчиков Django.
+
+Запуск из корня репозитория:
+    python benchmarks/upload_memory.py
+"""
+import os
+import sys
+import tracemalloc
+from io import BytesIO
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from posts.forms import PostForm  # noqa: E402
+
+SIDES = (300, 800, 1500)
+HANDLERS = {
+    'stream': ['posts.uploads.ImageUploadHandler'],
+    'django': ['django.core.files.uploadhandler.MemoryFileUploadHandler',
+               'django.core.files.uploadhandler.TemporaryFileUploadHandler'],
+}
+
+
+def make_png(side):
+    noise = os.urandom(side * side * 3)
+    buffer = BytesIO()
+    Image.frombytes('RGB', (side, side), noise).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def peak_memory(content):
+    request = RequestFactory().post('/new/', {
+        'text': 'текст',
+        'image': SimpleUploadedFile('picture.png', content),
+    })
+    tracemalloc.start()
+    try:
+        PostForm(request.POST, request.FILES).is_valid()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    columns = ' '.join(f'{name + " KB":>10}' for name in HANDLERS)
+    print(f'{"file KB":>8} {columns}')
+    # Django держит в памяти файлы до FILE_UPLOAD_MAX_MEMORY_SIZE
+    with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100 * 1024 * 1024):
+        peak_memory(make_png(10))
+        for side in SIDES:
+            content = make_png(side)
+            peaks = []
+            for handlers in HANDLERS.values():
+                with override_settings(FILE_UPLOAD_HANDLERS=handlers):
+                    peaks.append(peak_memory(content))
+            print(f'{len(content) // 1024:>8} '
+                  + ' '.join(f'{peak // 1024:>10}' for peak in peaks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Нагрузочный прогон всех страниц posts/urls.py на синтетических данных.
+
+Скрипт создаёт временную базу SQLite, заполняет её через
+posts.transfer (пользователи, группы, посты, комментарии, подписки
+со степенным распределением популярности авторов) и открывает
+каждую страницу тестовым клиентом. Для каждой страницы в отчёт JSON
+попадают перцентили времени ответа, число запросов к базе и пиковая
+память, а в конец отчёта — самые дорогие запросы posts.slowlog.
+Отчёты разных коммитов сравниваются флагом --compare.
+
+Запуск из корня репозитория:
+    python benchmarks/views.py --posts 20000 --output report.json
+    python benchmarks/views.py --posts 20000 --compare report.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+TMP_DIR = tempfile.mkdtemp()
+settings.DATABASES['default']['NAME'] = os.path.join(TMP_DIR, 'bench.sqlite3')
+settings.DEBUG = False
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, reset_queries, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               setup_test_environment)
+from django.urls import reverse  # noqa: E402
+
+from posts import transfer  # noqa: E402
+from posts.models import Group, Post, User  # noqa: E402
+from posts.slowlog import SLOW_QUERIES  # noqa: E402
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+WORDS = ('викинг набег корабль море север конунг дружина поход песня '
+         'сага золото щит меч ворон зима весна берег остров пир')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=float, default=2,
+                        help='Комментариев на пост в среднем')
+    parser.add_argument('--follows', type=int, default=30,
+                        help='Подписок на пользователя в среднем')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Запросов к каждой странице')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Файл отчёта JSON')
+    parser.add_argument('--compare', help='Отчёт для сравнения')
+    return parser.parse_args()
+
+
+def text(rng, words=12):
+    return ' '.join(rng.choices(WORDS.split(), k=rng.randint(3, words)))
+
+
+def dataset(options, rng):
+    """Записи для posts.transfer. Популярность авторов по Ципфу."""
+    usernames = [f'user{i}' for i in range(options.users)]
+    weights = [1 / (rank + 1) for rank in range(options.users)]
+    for i in range(options.groups):
+        yield {'model': 'group', 'title': f'Группа {i}', 'slug': f'group-{i}',
+               'description': text(rng)}
+    for pk in range(1, options.posts + 1):
+        yield {'model': 'post', 'id': pk, 'text': text(rng, 60),
+               'pub_date': (START + timedelta(minutes=pk)).isoformat(),
+               'author': rng.choices(usernames, weights)[0],
+               'group': (f'group-{rng.randrange(options.groups)}'
+                         if options.groups and rng.random() < 0.7 else None)}
+    for _ in range(int(options.posts * options.comments)):
+        yield {'model': 'comment', 'post': rng.randint(1, options.posts),
+               'author': rng.choice(usernames), 'text': text(rng)}
+    for user in usernames:
+        for author in set(rng.choices(usernames, weights,
+                                      k=options.follows)):
+            yield {'model': 'follow', 'user': user, 'author': author}
+
+
+def build(options):
+    call_command('migrate', verbosity=0)
+    rng = random.Random(options.seed)
+    with transaction.atomic():
+        transfer.Importer().run(dataset(options, rng))
+    for command in ('rebuild_counters', 'rebuild_timelines',
+                    'rebuild_search_index'):
+        started = time.perf_counter()
+        call_command(command, stdout=open(os.devnull, 'w'))
+        print(f'{command}: {time.perf_counter() - started:.1f} с',
+              file=sys.stderr)
+
+
+def pages():
+    """(имя, URL, нужен ли вход) для каждой страницы posts/urls.py."""
+    author = User.objects.order_by('-stats__posts_count').first()
+    post = Post.objects.filter(author=author).order_by('-comments_count')[0]
+    group = Group.objects.order_by('pk').first()
+    return [
+        ('index', reverse('index'), False),
+        ('index_page_50', reverse('index') + '?page=50', False),
+        ('group_posts', reverse('group_posts', args=[group.slug]), False),
+        ('profile', reverse('profile', args=[author.username]), False),
+        ('post_view', reverse('post', args=[author.username, post.pk]),
+         False),
+        ('follow_index', reverse('follow_index'), True),
+        ('search', reverse('search') + '?q=викинг+корабли', False),
+        ('new_post', reverse('new_post'), True),
+        ('post_edit', reverse('post_edit', args=[author.username, post.pk]),
+         True),
+    ], author
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def timed_get(client, url):
+    reset_queries()
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - started) * 1000
+    return response, elapsed, len(context.captured_queries)
+
+
+def measure(client, url, requests):
+    """
+    Первый запрос с пустым кэшем (cold), затем requests запросов
+    с прогретым кэшем и один под tracemalloc для пиковой памяти.
+    """
+    cache.clear()
+    _, cold, cold_queries = timed_get(client, url)
+    timings = []
+    for _ in range(requests):
+        response, elapsed, queries = timed_get(client, url)
+        timings.append(elapsed)
+    tracemalloc.start()
+    client.get(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': queries,
+        'cold_queries': cold_queries,
+        'cold_ms': round(cold, 2),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'peak_memory_kb': peak // 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    metrics = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb')
+    print(f'{"page":<16}' + ''.join(f'{metric:>22}' for metric in metrics))
+    for name, result in report['pages'].items():
+        base = baseline['pages'].get(name)
+        if base is None:
+            continue
+        cells = []
+        for metric in metrics:
+            old, new = base[metric], result[metric]
+            change = (new - old) / old * 100 if old else 0
+            cells.append(f'{old:>8} → {new:<8} {change:+4.0f}%')
+        print(f'{name:<16}' + ''.join(f'{cell:>22}' for cell in cells))
+
+
+def main():
+    options = parse_args()
+    setup_test_environment()
+    started = time.perf_counter()
+    build(options)
+    SLOW_QUERIES.clear()
+    print(f'Данные созданы за {time.perf_counter() - started:.1f} с',
+          file=sys.stderr)
+    urls, author = pages()
+    anonymous, logged_in = Client(), Client()
+    logged_in.force_login(author)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': {name: getattr(options, name) for name in
+                    ('users', 'groups', 'posts', 'comments', 'follows',
+                     'seed')},
+        'requests': options.requests,
+        'pages': {},
+    }
+    for name, url, login in urls:
+        client = logged_in if login else anonymous
+        report['pages'][name] = measure(client, url, options.requests)
+        print(name, report['pages'][name], file=sys.stderr)
+    report['slow_queries'] = SLOW_QUERIES.top(10)
+    if options.output:
+        with open(options.output, 'w') as stream:
+            json.dump(report, stream, indent=2, ensure_ascii=False)
+    if options.compare:
+        with open(options.compare) as stream:
+            compare(report, json.load(stream))
+    elif not options.output:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Бюджеты запросов к базе и времени рендера шаблонов для страниц.
+
+Фикстура check_budget открывает страницу с пустым кэшем, считает
+SQL-запросы и время рендера шаблона. При превышении тест падает
+с дифом: запросы в пределах бюджета помечены пробелом, лишние — «+»,
+а повторяющиеся запросы (типичный N+1) сгруппированы с числом повторов.
+
+Время рендера зависит от машины, поэтому бюджет времени умножается
+на переменную окружения BUDGET_TIME_FACTOR (по умолчанию 1).
+"""
+import os
+import time
+from collections import Counter
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.template.backends.django import Template
+from django.test.utils import CaptureQueriesContext
+
+from posts.slowlog import normalize
+
+
+def budget_report(name, url, queries, max_queries):
+    lines = [f'{name} ({url}): {len(queries)} запросов, '
+             f'бюджет {max_queries}', '']
+    for number, sql in enumerate(queries, 1):
+        marker = ' ' if number <= max_queries else '+'
+        lines.append(f'{marker} {number}. {sql}')
+    repeated = [(count, sql) for sql, count
+                in Counter(normalize(sql) for sql in queries).items()
+                if count > 1]
+    if repeated:
+        lines += ['', 'Повторяющиеся запросы:']
+        lines += [f'  ×{count} {sql}' for count, sql in sorted(repeated,
+                                                               reverse=True)]
+    return '\n'.join(lines)
+
+
+class RenderTimer:
+    """Суммарное время Template.render бэкенда Django за запрос."""
+
+    def __init__(self, monkeypatch):
+        self.seconds = 0
+        original = Template.render
+        timer = self
+
+        def render(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                timer.seconds += time.perf_counter() - started
+
+        monkeypatch.setattr(Template, 'render', render)
+
+
+@pytest.fixture
+def check_budget(monkeypatch):
+    """
+    check_budget(name, client, url, queries=..., render_ms=...)
+    открывает url клиентом и проверяет бюджет страницы name.
+    Возвращает ответ.
+    """
+    factor = float(os.environ.get('BUDGET_TIME_FACTOR', 1))
+    timer = RenderTimer(monkeypatch)
+
+    def check(name, client, url, queries, render_ms, method='get',
+              data=None):
+        cache.clear()
+        timer.seconds = 0
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data)
+        captured = [query['sql'] for query in context.captured_queries]
+        if len(captured) > queries:
+            pytest.fail(budget_report(name, url, captured, queries),
+                        pytrace=False)
+        elapsed = timer.seconds * 1000
+        if elapsed > render_ms * factor:
+            pytest.fail(f'{name} ({url}): рендер шаблона занял '
+                        f'{elapsed:.1f} мс, бюджет {render_ms * factor:.0f} '
+                        f'мс', pytrace=False)
+        return response
+
+    return check
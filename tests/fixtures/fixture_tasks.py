@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_tasks(settings):
+    """Фоновые задачи выполняются сразу, как в yatube.runner."""
+    settings.TASKS = {**settings.TASKS, 'BACKEND': 'eager'}
@@ -0,0 +1,96 @@
+import pytest
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Comment, Follow, Post
+
+# Бюджеты страниц posts.urls при пустом кэше:
+# имя URL -> (запросов к базе не больше, рендер шаблона не дольше мс).
+# Страница ленты содержит полную страницу карточек, поэтому лишний
+# запрос в post_item.html превышает бюджет на десяток запросов.
+# В бюджет лент и страницы поста входит запрос валидаторов ETag
+# (posts.conditional), в бюджет отписки — имя автора для сброса кэша
+# его страниц (posts.pagecache). JSON API (posts.api) без шаблонов:
+# его «рендер» — сериализация ответа.
+BUDGETS = {
+    'index': (6, 50),
+    'group_posts': (7, 50),
+    'search': (5, 50),
+    'metrics': (2, 10),
+    'slow_queries': (2, 10),
+    'profile': (9, 50),
+    'post': (8, 50),
+    'follow_index': (5, 50),
+    'new_post': (3, 60),
+    'post_edit': (5, 50),
+    'add_comment': (3, 10),
+    'profile_follow': (4, 10),
+    'profile_unfollow': (9, 10),
+    '404': (2, 50),
+    '500': (2, 20),
+    'api_index': (4, 20),
+    'api_group_posts': (5, 20),
+    'api_follow_index': (4, 20),
+    'api_profile': (7, 20),
+    'api_post': (7, 20),
+}
+
+
+@pytest.fixture
+def budget_post(user, another_user, group):
+    Follow.objects.create(user=user, author=another_user)
+    posts = [Post.objects.create(text=f'Тестовый пост {i}', author=another_user,
+                                 group=group)
+             for i in range(12)]
+    for post in posts:
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+    return posts[-1]
+
+
+def budget_urls(post):
+    author = post.author.username
+    return {
+        'index': reverse('index'),
+        'group_posts': reverse('group_posts', args=[post.group.slug]),
+        'search': reverse('search') + '?q=пост',
+        'metrics': reverse('metrics'),
+        'slow_queries': reverse('slow_queries'),
+        'profile': reverse('profile', args=[author]),
+        'post': reverse('post', args=[author, post.pk]),
+        'follow_index': reverse('follow_index'),
+        'new_post': reverse('new_post'),
+        'post_edit': reverse('post_edit', args=[author, post.pk]),
+        'add_comment': reverse('add_comment', args=[author, post.pk]),
+        'profile_follow': reverse('profile_follow', args=[author]),
+        'profile_unfollow': reverse('profile_unfollow', args=[author]),
+        # сам маршрут 404/ без exception не работает, handler404 — работает
+        '404': '/no/such/page/here/',
+        '500': reverse('500'),
+        'api_index': reverse('api_index'),
+        'api_group_posts': reverse('api_group_posts',
+                                   args=[post.group.slug]),
+        'api_follow_index': reverse('api_follow_index'),
+        'api_profile': reverse('api_profile', args=[author]),
+        'api_post': reverse('api_post', args=[author, post.pk]),
+    }
+
+
+class TestBudgets:
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        assert names == set(BUDGETS), (
+            'Задайте бюджет запросов и времени рендера для каждого URL '
+            f'из posts.urls, нет бюджета для: {names - set(BUDGETS)}'
+        )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('name', sorted(BUDGETS))
+    def test_budget(self, name, check_budget, user_client, client,
+                    budget_post):
+        queries, render_ms = BUDGETS[name]
+        url = budget_urls(budget_post)[name]
+        if name == 'post_edit':
+            user_client = client
+            user_client.force_login(budget_post.author)
+        check_budget(name, user_client, url, queries, render_ms)
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
 
-from .models import Group, Post
+from .models import Group, Post, Task
+from .search import SearchResults
 
 
 @admin.register(Post)
@@ -10,8 +12,22 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по индексу posts.search вместо LIKE '%…%' по всей таблице
+        if not search_term:
+            return queryset, False
+        ids = SearchResults(search_term).ids(0, settings.SEARCH_MAX_RESULTS)
+        return queryset.filter(pk__in=ids), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
     empty_value_display = '-пусто-'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'args', 'attempts', 'run_at', 'failed')
+    list_filter = ('failed', 'name')
+    empty_value_display = '-пусто-'
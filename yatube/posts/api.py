@@ -0,0 +1,199 @@
+"""
+JSON API для чтения лент, страницы профиля и поста.
+
+Ленты листаются по курсору (posts.paginator.CursorPaginator): ответ
+содержит results и ссылки next и previous. Параметр fields выбирает
+поля поста через запятую, например ?fields=id,text,author; выборка
+читает только нужные колонки (.only()), а автор и группа приходят тем
+же запросом через JOIN (select_related) и только если их запросили.
+
+Ответы проходят те же ETag (posts.conditional) и кэш страниц гостей
+(posts.pagecache), что и HTML-страницы. Лента подписок доступна
+по сессии, без неё — 401.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from . import conditional, timeline
+from .models import Comment, Group, Post, User
+from .pagecache import cache_for_guests
+from .paginator import CursorPaginator
+from .routers import read_only
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+
+
+def user_data(user):
+    return {'id': user.pk, 'username': user.username,
+            'full_name': user.get_full_name()}
+
+
+def thumbnail_data(post):
+    if not post.thumbnail_url:
+        return None
+    return {'url': post.thumbnail_url, 'srcset': post.thumbnail_srcset,
+            'webp_srcset': post.thumbnail_webp_srcset}
+
+
+# поле API -> (колонки для .only(), связь для select_related, значение)
+FIELDS = {
+    'id': ((), None, lambda post: post.pk),
+    'text': (('text',), None, lambda post: post.text),
+    'pub_date': ((), None, lambda post: post.pub_date.isoformat()),
+    'image': (('image',), None,
+              lambda post: post.image.url if post.image else None),
+    'thumbnail': (('thumbnail_url', 'thumbnail_srcset',
+                   'thumbnail_webp_srcset'), None, thumbnail_data),
+    'comments_count': (('comments_count',), None,
+                       lambda post: post.comments_count),
+    'author': (('author__username', 'author__first_name',
+                'author__last_name'), 'author',
+               lambda post: user_data(post.author)),
+    'group': (('group__slug', 'group__title'), 'group',
+              lambda post: post.group and {'id': post.group.pk,
+                                           'slug': post.group.slug,
+                                           'title': post.group.title}),
+}
+
+
+def requested_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',')
+                                if name.strip()))
+    unknown = set(fields) - set(FIELDS)
+    if unknown or not fields:
+        raise ApiError(400, f'Неизвестные поля: '
+                            f'{", ".join(sorted(unknown))}. '
+                            f'Доступны: {", ".join(FIELDS)}')
+    return fields
+
+
+def project(queryset, fields):
+    """Выборка только колонок полей fields, связи — одним запросом."""
+    # pub_date нужна курсору даже без поля pub_date в ответе
+    columns = ['pub_date']
+    relations = []
+    for name in fields:
+        names, relation, _ = FIELDS[name]
+        columns.extend(names)
+        if relation:
+            relations.append(relation)
+            columns.append(relation)
+    queryset = queryset.select_related(None).only(*columns)
+    # select_related() без аргументов потянул бы все связи
+    return queryset.select_related(*relations) if relations else queryset
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name][2](post) for name in fields}
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def feed(request, queryset, **extra):
+    """Страница ленты по курсору из запроса."""
+    fields = requested_fields(request)
+    page = CursorPaginator(project(queryset, fields),
+                           settings.POSTS_PER_PAGE).get_page(
+        request.GET.get('cursor'))
+    return {
+        **extra,
+        'results': [serialize(post, fields) for post in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+
+
+def api_view(view):
+    """Ответ JSON; 404 и ошибки параметров — тоже JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data, status = view(request, *args, **kwargs), 200
+        except Http404:
+            data, status = {'detail': 'Не найдено'}, 404
+        except ApiError as error:
+            data, status = {'detail': str(error)}, error.status
+        # кириллица без экранирования \uXXXX втрое короче
+        return JsonResponse(data, status=status,
+                            json_dumps_params={'ensure_ascii': False})
+    return wrapper
+
+
+@cache_for_guests('index')
+@read_only
+@condition(etag_func=conditional.index_etag)
+@api_view
+def index(request):
+    return feed(request, Post.objects.all())
+
+
+@cache_for_guests('group:{slug}')
+@read_only
+@condition(etag_func=conditional.group_etag)
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed(request, group.posts.all(), group={
+        'id': group.pk, 'slug': group.slug, 'title': group.title,
+        'description': group.description})
+
+
+@cache_for_guests('author:{username}')
+@read_only
+@condition(etag_func=conditional.profile_etag)
+@api_view
+def profile(request, username):
+    user = get_object_or_404(User, username=username)
+    stats, following = conditional.author_state(request, user.pk)
+    return feed(request, user.posts.all(), author={
+        **user_data(user), 'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': following})
+
+
+@cache_for_guests('author:{username}', 'post:{post_id}')
+@read_only
+@condition(etag_func=conditional.post_etag)
+@api_view
+def post_view(request, username, post_id):
+    fields = requested_fields(request)
+    post = get_object_or_404(project(Post.objects.all(), fields),
+                             pk=post_id, author__username=username)
+    comments = (Comment.objects.filter(post_id=post_id)
+                .select_related('author')
+                .only('text', 'created', 'author', 'author__username',
+                      'author__first_name', 'author__last_name'))
+    return {
+        **serialize(post, fields),
+        'comments': [{'id': comment.pk, 'text': comment.text,
+                      'created': comment.created.isoformat(),
+                      'author': user_data(comment.author)}
+                     for comment in comments],
+    }
+
+
+@read_only
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+    return feed(request, timeline.posts_for(request.user))
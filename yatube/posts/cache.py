@@ -0,0 +1,216 @@
+"""
+Кэширование лент.
+
+Карточки постов (post_item.html): ключ карточки включает версию
+поста и версию его группы. Версии хранятся в кэше отдельно и меняются
+сигналами: поста — при изменении поста или его комментариев, группы —
+при изменении группы, одной записью на все её посты. Поэтому любая
+лента переиспользует готовые карточки и перерисовывает только
+изменившиеся.
+Карточку с версией, появившейся уже после начала запроса, запрос
+рисует, но в кэш не кладёт; то же при чтении с реплики, которая
+могла отстать от версии (posts.routers.may_lag).
+
+Данные лент (cached): значение пересчитывается заранее с вероятностью,
+растущей к концу срока (probabilistic early expiration), и только
+одним процессом за раз, остальные в это время получают прежнее
+значение. Так истечение горячего ключа не бьёт по базе разом из
+всех воркеров. Блокировка — cache.add, между процессами она атомарна
+только в memcached; с кэшем file два процесса изредка пересчитают
+ключ одновременно, с locmem каждый процесс пересчитывает свой.
+Поколение лент тоже помечено временем: пока реплика может отставать
+от invalidate_feeds, читающий с неё запрос считает ленту сам
+и в кэш не пишет.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import metrics, routers
+
+VERSION_KEY = 'post_card_version:{}'
+GROUP_VERSION_KEY = 'group_version:{}'
+CARD_KEY = 'post_card:{}:{}:{}:{}'
+# версия группы в ключе карточки поста без группы
+NO_GROUP = '-'
+
+
+def new_version(created=None):
+    """Версия карточки; в начале — время её создания."""
+    if created is None:
+        created = time.time()
+    return f'{created!r}:{uuid.uuid4().hex}'
+
+
+def version_time(version):
+    created, stamped, _ = version.partition(':')
+    # версии без времени остались в кэше от прежнего формата
+    return float(created) if stamped else 0.0
+
+
+def is_storable(version, since=None):
+    """Можно ли кэшировать данные версии version, прочитанные после since."""
+    changed = version_time(version)
+    return ((since is None or changed < since)
+            and not routers.may_lag(changed))
+
+
+def _versions(key_format, ids):
+    """Текущие версии ids; недостающие создаются заново."""
+    keys = {key_format.format(pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        # ключ вытеснен или ещё не создан: возраст версии неизвестен,
+        # add не затирает версию, которую успел записать _invalidate
+        version = new_version(created=0.0)
+        if not cache.add(key, version, settings.POST_CARD_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+        found[key] = version
+    return {keys[key]: version for key, version in found.items()}
+
+
+def card_versions(post_ids):
+    return _versions(VERSION_KEY, post_ids)
+
+
+def group_versions(group_ids):
+    return _versions(GROUP_VERSION_KEY, group_ids)
+
+
+def _write_versions(key_format, ids):
+    version = new_version()
+    cache.set_many({key_format.format(pk): version for pk in ids},
+                   settings.POST_CARD_CACHE_TIMEOUT)
+
+
+def _invalidate(key_format, ids):
+    """
+    Сигналы вызывают сброс версий до COMMIT, поэтому внутри
+    транзакции версия пишется ещё раз после COMMIT: иначе запрос,
+    прочитавший старые строки, положил бы их в кэш под новую версию.
+    """
+    ids = list(ids)
+    _write_versions(key_format, ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _write_versions(key_format, ids))
+
+
+def invalidate_cards(post_ids):
+    """Новые версии карточек post_ids."""
+    _invalidate(VERSION_KEY, post_ids)
+
+
+def invalidate_groups(group_ids):
+    """Новые версии групп: меняются карточки всех их постов."""
+    _invalidate(GROUP_VERSION_KEY, group_ids)
+
+
+def render_cards(posts, render, viewer_id=None, since=None):
+    """
+    HTML карточек posts по порядку. render(post) вызывается только
+    для карточек, которых нет в кэше. Кнопка «Редактировать» видна
+    лишь автору, поэтому его карточки кэшируются отдельно.
+
+    since — время начала запроса, то есть не позже чтения posts из
+    базы. Карточка, у которой версия поста или группы новее since,
+    могла быть нарисована из строк, прочитанных до изменения, и в кэш
+    не кладётся, как и карточка, которую реплика ещё может показывать
+    устаревшей.
+    """
+    posts = list(posts)
+    versions = card_versions([post.pk for post in posts])
+    groups = group_versions({post.group_id for post in posts} - {None})
+    stamps = [(versions[post.pk], groups.get(post.group_id, NO_GROUP))
+              for post in posts]
+    keys = [CARD_KEY.format(post.pk, *stamp,
+                            int(post.author_id == viewer_id))
+            for post, stamp in zip(posts, stamps)]
+    cards = cache.get_many(keys)
+    metrics.incr('cache_hits', len(cards))
+    metrics.incr('cache_misses', len(keys) - len(cards))
+    rendered = {}
+    for key, post, stamp in zip(keys, posts, stamps):
+        if key not in cards:
+            cards[key] = render(post)
+            if all(is_storable(version, since) for version in stamp):
+                rendered[key] = cards[key]
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return [cards[key] for key in keys]
+
+
+FEED_GENERATION_KEY = 'feed_generation'
+LOCK_KEY = '{}:lock'
+# Чем больше BETA, тем раньше начинается досрочный пересчёт
+BETA = 1.0
+POLL_INTERVAL = 0.05
+
+
+def feed_generation():
+    generation = cache.get(FEED_GENERATION_KEY)
+    if generation is None:
+        generation = new_version(created=0.0)
+        cache.add(FEED_GENERATION_KEY, generation, None)
+        generation = cache.get(FEED_GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_feeds():
+    """Помечает данные всех лент устаревшими."""
+    cache.set(FEED_GENERATION_KEY, new_version(), None)
+
+
+def _is_fresh(entry, generation):
+    value, expires, delta, entry_generation = entry
+    if entry_generation != generation:
+        return False
+    jitter = -delta * BETA * math.log(1 - random.random())
+    return time.time() + jitter < expires
+
+
+def _store(key, compute, generation):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    expires = time.time() + settings.FEED_CACHE_TIMEOUT
+    cache.set(key, (value, expires, delta, generation),
+              settings.FEED_CACHE_TIMEOUT + settings.FEED_CACHE_STALE)
+    return value
+
+
+def cached(key, compute):
+    """
+    compute() из общего кэша с защитой от одновременного пересчёта.
+    Данные устаревают через FEED_CACHE_TIMEOUT и при invalidate_feeds.
+    """
+    generation = feed_generation()
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, generation):
+        metrics.incr('cache_hits')
+        return entry[0]
+    if not is_storable(generation):
+        metrics.incr('cache_misses')
+        return compute()
+    lock = LOCK_KEY.format(key)
+    if not cache.add(lock, 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+        if entry is not None:
+            metrics.incr('cache_hits')
+            return entry[0]
+        deadline = time.time() + settings.FEED_CACHE_LOCK_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # пересчитывающий процесс не успел: считаем сами
+        return compute()
+    metrics.incr('cache_misses')
+    try:
+        return _store(key, compute, generation)
+    finally:
+        cache.delete(lock)
@@ -0,0 +1,72 @@
+"""
+Параллельные независимые запросы к базе внутри представления.
+
+Django 2.2 не умеет асинхронные представления, поэтому независимые
+выборки (подписан ли читатель, счётчики автора, комментарии)
+выполняет пул из VIEW_LOOKUP_THREADS потоков. У каждого потока своё
+соединение с базой, и время ответа складывается не из суммы
+задержек запросов, а из самой долгой.
+
+В поток переносится то, что хранится в threading.local запроса:
+реплика posts.routers, представление для posts.slowlog и метрики
+posts.metrics. Внутри транзакции запросы идут последовательно
+в текущем потоке: другие соединения не видят её незакоммиченных
+изменений.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import metrics, routers, slowlog
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(settings.VIEW_LOOKUP_THREADS,
+                                       thread_name_prefix='lookup')
+    return _executor
+
+
+def in_transaction():
+    return any(db.in_atomic_block for db in connections.all())
+
+
+def _run(function, replica, source, collected):
+    with ExitStack() as stack:
+        if replica:
+            stack.enter_context(routers.replica(replica))
+        stack.enter_context(slowlog.issued_by(source))
+        if collected is not None:
+            stack.enter_context(metrics.collect(collected))
+            stack.enter_context(metrics.counting(collected))
+        try:
+            return function()
+        finally:
+            close_old_connections()
+
+
+def fetch(queryset):
+    """Читает queryset сразу: шаблон получит уже загруженные строки."""
+    len(queryset)
+    return queryset
+
+
+def gather(*functions):
+    """
+    Результаты functions в том же порядке. Первая функция выполняется
+    в текущем потоке, остальные — в пуле; исключение любой из них
+    поднимается здесь.
+    """
+    if (len(functions) < 2 or not settings.VIEW_LOOKUP_THREADS
+            or in_transaction()):
+        return [function() for function in functions]
+    state = (routers.current_replica(), slowlog.source(), metrics.current())
+    futures = [executor().submit(_run, function, *state)
+               for function in functions[1:]]
+    first = functions[0]()
+    return [first] + [future.result() for future in futures]
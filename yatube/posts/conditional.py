@@ -0,0 +1,111 @@
+"""
+Условные GET для лент и страницы поста.
+
+ETag страницы складывается из дешёвых валидаторов: последний пост
+ленты (pub_date и id по индексам лент), последний комментарий,
+счётчики автора и подписан ли на него читатель. Правки и удаления
+постов и комментариев, переименование группы и готовые миниатюры
+их не меняют, поэтому в ETag входят и версии, которые сбрасывают
+сигналы: поколение лент, версии карточки поста и его группы из
+posts.cache, версии областей страницы из posts.pagecache.
+Авторизованному пользователю страница отдаётся с формой и CSRF-токеном,
+так что в ETag входят его id и CSRF-cookie.
+
+Функции *_etag подключаются к представлениям декоратором
+django.views.decorators.http.condition: совпавший If-None-Match
+получает 304 Not Modified, а представление не вызывается, так что
+лента не выбирается и шаблон не рендерится. Для пустых групп
+и профилей ETag не считается (None), их страницы отдаются целиком.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from .cache import NO_GROUP, card_versions, feed_generation, group_versions
+from .models import AuthorStats, Comment, Follow, Post
+from .pagecache import scope_versions
+
+
+def make_etag(request, *validators):
+    parts = [request.get_full_path()]
+    if request.user.is_authenticated:
+        parts += [request.user.pk,
+                  request.COOKIES.get(settings.CSRF_COOKIE_NAME)]
+    parts += validators
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def latest(posts, *fields):
+    """
+    Последний пост ленты и последний комментарий на сайте (карточки
+    показывают число комментариев) одним запросом; None для пустой
+    ленты.
+    """
+    # id растут вместе с created: самый новый комментарий — по первичному
+    # ключу, без сортировки всей таблицы по created
+    last_comment = Comment.objects.order_by('-pk').values('pk')[:1]
+    return (posts.order_by('-pub_date', '-pk')
+            .annotate(last_comment=Subquery(last_comment))
+            .values_list('pk', 'pub_date', 'last_comment', *fields)
+            .first())
+
+
+def author_state(request, author_id):
+    """
+    Счётчики автора и подписан ли на него читатель. Запоминаются
+    в запросе: представление берёт их отсюда, а не читает заново.
+    """
+    states = request.__dict__.setdefault('author_states', {})
+    if author_id not in states:
+        stats = AuthorStats.objects.for_user(author_id)
+        following = (request.user.is_authenticated
+                     and Follow.objects.filter(user=request.user,
+                                               author_id=author_id).exists())
+        states[author_id] = stats, following
+    return states[author_id]
+
+
+def index_etag(request):
+    return make_etag(request, feed_generation(), *scope_versions(['index']),
+                     latest(Post.objects.all()))
+
+
+def group_etag(request, slug):
+    # заголовок и описание группы выводятся над лентой
+    row = latest(Post.objects.filter(group__slug=slug),
+                 'group__title', 'group__description')
+    if row is None:
+        return None
+    return make_etag(request, feed_generation(),
+                     *scope_versions([f'group:{slug}']), row)
+
+
+def profile_etag(request, username):
+    row = latest(Post.objects.filter(author__username=username),
+                 'author_id')
+    if row is None:
+        return None
+    stats, following = author_state(request, row[-1])
+    return make_etag(request, feed_generation(),
+                     *scope_versions([f'author:{username}', 'groups']), row,
+                     stats.posts_count, stats.followers_count,
+                     stats.following_count, following)
+
+
+def post_etag(request, username, post_id):
+    last_comment = (Comment.objects.filter(post_id=OuterRef('pk'))
+                    .order_by('-created').values('created')[:1])
+    row = (Post.objects.filter(pk=post_id, author__username=username)
+           .annotate(last_comment=Subquery(last_comment))
+           .values_list('author_id', 'pub_date', 'comments_count',
+                        'last_comment', 'group_id')
+           .first())
+    if row is None:
+        return None
+    stats, following = author_state(request, row[0])
+    group_id = row[-1]
+    group = group_versions([group_id])[group_id] if group_id else NO_GROUP
+    return make_etag(request, row, card_versions([post_id])[post_id], group,
+                     stats.posts_count, stats.followers_count,
+                     stats.following_count, following)
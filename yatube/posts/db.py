@@ -0,0 +1,81 @@
+"""
+Настройка соединений с базой.
+
+Каждое новое соединение с SQLite получает PRAGMA из SQLITE['PRAGMAS'].
+В режиме WAL читатели не блокируются писателем и наоборот, а
+synchronous=NORMAL в WAL не теряет целостность базы, только последние
+транзакции при отключении питания. busy_timeout заставляет писателя
+ждать освобождения блокировки, а не сразу падать с «database is
+locked». journal_mode хранится в самом файле базы, остальные
+настройки действуют, пока открыто соединение.
+
+busy_timeout не спасает транзакцию, которая начала с чтения,
+а потом пишет: если базу успел изменить другой писатель, SQLite
+отказывает ей сразу. Поэтому при SQLITE['TRANSACTION_MODE'] =
+'IMMEDIATE' транзакции atomic() начинаются с BEGIN IMMEDIATE
+и берут блокировку записи в самом начале, ожидая её не дольше
+busy_timeout (в Django 5.1 это OPTIONS transaction_mode).
+
+Соединения живут между запросами CONN_MAX_AGE секунд, поэтому PRAGMA
+и открытие соединения не повторяются в каждом запросе. Устаревшие
+соединения закрывает сам Django в начале запроса, а при
+DATABASE_HEALTH_CHECKS check_connections ещё и проверяет оставшиеся:
+соединение, оборванное сервером базы, закрывается до того, как запрос
+на нём упадёт (в Django 4.1 это CONN_HEALTH_CHECKS). Доля
+переиспользованных соединений видна в /metrics/.
+"""
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+logger = logging.getLogger('posts.db')
+
+
+def begin(connection, mode):
+    connection.cursor().execute(f'BEGIN {mode}')
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    metrics.incr('db_connections_opened')
+
+
+def check_connection(connection):
+    """Закрывает соединение, если оно открыто и не отвечает."""
+    if connection.connection is None or connection.is_usable():
+        return True
+    logger.warning('Соединение %s не отвечает, закрыто', connection.alias)
+    connection.close()
+    return False
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    # после close_old_connections Django: устаревшие уже закрыты
+    if settings.DATABASE_HEALTH_CHECKS:
+        for connection in connections.all():
+            check_connection(connection)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = settings.SQLITE['PRAGMAS']
+    if pragmas:
+        with connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+    mode = settings.SQLITE['TRANSACTION_MODE']
+    if mode:
+        connection._start_transaction_under_autocommit = partial(
+            begin, connection, mode)
+    else:
+        vars(connection).pop('_start_transaction_under_autocommit', None)
@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -10,6 +12,23 @@ class PostForm(ModelForm):
         labels = {'group': 'Выберите группу', 'text': 'Текст поста',
                   'image': 'Загрузите изображение'}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # картинку с ошибкой проверки по заголовку ImageField
+        # не получает и не декодирует целиком
+        self.image_error = None
+        image = self.files.get('image')
+        if image:
+            self.image_error = uploads.upload_error(image)
+        if self.image_error:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_error:
+            raise ValidationError(self.image_error, code='invalid_image')
+        return self.cleaned_data['image']
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки '
+            'в JSONL или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='По умолчанию по расширению файла')
+        parser.add_argument(
+            '--models', default=','.join(transfer.MODELS),
+            help='Через запятую: ' + ', '.join(transfer.MODELS))
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, path, **options):
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        write = getattr(transfer, f'write_{file_format}')
+        records = transfer.export_records(options['models'].split(','),
+                                          options['batch_size'])
+        if path == '-':
+            total = write(records, sys.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                total = write(records, stream)
+        self.stderr.write(f'Выгружено записей: {total}')
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки '
+            'из JSONL или CSV пачками через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='По умолчанию по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересобирать счётчики, ленты и поисковый индекс')
+
+    def handle(self, *args, path, **options):
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        read = getattr(transfer, f'read_{file_format}')
+        importer = transfer.Importer(options['batch_size'])
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        try:
+            with transaction.atomic():
+                counts = importer.run(read(stream))
+        except (IntegrityError, KeyError, ValueError) as error:
+            raise CommandError(f'Ошибка в данных: {error!r}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not options['no_rebuild']:
+            for command in ('rebuild_counters', 'rebuild_timelines',
+                            'rebuild_search_index'):
+                call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(f'{model} {count}'
+                                      for model, count in counts.items())))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats, Post
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики постов, комментариев '
+            'и подписок по данным в базе')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.recount_comments()
+        authors = AuthorStats.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, авторов: {authors}'))
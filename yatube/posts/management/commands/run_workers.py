@@ -0,0 +1,55 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import tasks
+
+
+def serve(burst):
+    """Процесс воркера: SIGTERM и SIGINT дают доделать текущую задачу."""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+    return tasks.work(stop, burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Запускает процессы, которые выполняют фоновые задачи из базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.TASKS['PROCESSES'],
+            help='Число процессов-воркеров')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда в очереди не останется готовых задач')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            done = serve(options['burst'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Выполнено задач: {done}'))
+            return
+        # дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+        workers = [multiprocessing.Process(target=serve,
+                                           args=(options['burst'],),
+                                           name=f'worker-{number}')
+                   for number in range(options['processes'])]
+        for worker in workers:
+            worker.start()
+
+        def stop(signum, frame):
+            for worker in workers:
+                worker.terminate()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, stop)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'Воркеры остановлены: {len(workers)}'))
@@ -0,0 +1,204 @@
+"""
+Метрики производительности запросов.
+
+PerformanceMiddleware (posts.middleware) для доли METRICS_SAMPLE_RATE
+запросов заводит RequestMetrics: через execute_wrapper соединений
+всех баз считает запросы и их время, шаблонный бэкенд DjangoTemplates
+добавляет время рендера, posts.cache и posts.pagecache — попадания
+и промахи кэша, posts.thumbnails и posts.tasks — поставленные
+в очередь миниатюры и фоновые задачи, posts.db — открытые соединения
+с базой, а соединения, открытые ещё прошлыми запросами, считаются
+переиспользованными. Итог уходит в заголовок Server-Timing, строку
+лога JSON и в REGISTRY, который отдаётся страницей /metrics/
+в текстовом формате Prometheus.
+
+Счётчики REGISTRY живут в памяти процесса: каждый воркер отдаёт
+свои, сервер метрик суммирует их сам. Запросы вне выборки
+не получают ни обёртки, ни таймеров.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.backends import django as django_backend
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Метрики одного запроса; сам объект — обёртка execute для базы."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.seconds = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds['db'] += time.perf_counter() - started
+            self.counters['db_queries'] += 1
+
+    def server_timing(self, total):
+        """Значение заголовка Server-Timing, длительности в мс."""
+        return ', '.join([
+            f'db;dur={self.seconds["db"] * 1000:.1f};'
+            f'desc="{self.counters["db_queries"]} queries"',
+            f'tpl;dur={self.seconds["template"] * 1000:.1f}',
+            f'cache;desc="{self.counters["cache_hits"]} hits '
+            f'{self.counters["cache_misses"]} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        data = dict(self.counters)
+        data.update({f'{name}_ms': round(value * 1000, 2)
+                     for name, value in self.seconds.items()})
+        return data
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def collect(metrics):
+    """Делает metrics текущими для потока на время запроса."""
+    _local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = None
+
+
+@contextmanager
+def counting(metrics):
+    """
+    Обёртка execute metrics на соединениях всех баз потока: с
+    YATUBE_REPLICAS чтения идут не в default.
+    """
+    with ExitStack() as stack:
+        for db in connections.all():
+            stack.enter_context(db.execute_wrapper(metrics))
+        yield metrics
+
+
+def incr(name, value=1):
+    metrics = current()
+    if metrics is not None and value:
+        metrics.counters[name] += value
+
+
+@contextmanager
+def timer(name):
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.seconds[name] += time.perf_counter() - started
+
+
+class Registry:
+    """Счётчики процесса по представлениям в формате Prometheus."""
+
+    HELP = {
+        'yatube_requests_total': 'Sampled requests',
+        'yatube_request_seconds_total': 'Time spent in sampled requests',
+        'yatube_db_queries_total': 'Database queries',
+        'yatube_db_seconds_total': 'Time spent in database queries',
+        'yatube_template_seconds_total': 'Time spent rendering templates',
+        'yatube_cache_hits_total': 'Feed and post card cache hits',
+        'yatube_cache_misses_total': 'Feed and post card cache misses',
+        'yatube_page_cache_hits_total': 'Guest page cache hits',
+        'yatube_page_cache_misses_total': 'Guest page cache misses',
+        'yatube_thumbnails_scheduled_total': 'Thumbnail jobs scheduled',
+        'yatube_thumbnails_generated_total': 'Thumbnail jobs finished',
+        'yatube_thumbnail_seconds_total': 'Time spent generating thumbnails',
+        'yatube_tasks_enqueued_total': 'Background tasks enqueued',
+        'yatube_tasks_total': 'Background tasks run',
+        'yatube_task_failures_total': 'Background tasks failed',
+        'yatube_task_seconds_total': 'Time spent running background tasks',
+        'yatube_slow_queries_total': 'Queries over SLOW_QUERY_THRESHOLD_MS',
+        'yatube_db_connections_opened_total': 'Database connections opened',
+        'yatube_db_connections_reused_total':
+            'Database connections reused from earlier requests',
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+
+    def add(self, name, value, view=None):
+        with self.lock:
+            self.values[name, view] += value
+
+    def record(self, view, metrics, total):
+        values = {
+            'yatube_requests_total': 1,
+            'yatube_request_seconds_total': total,
+            'yatube_db_queries_total': metrics.counters['db_queries'],
+            'yatube_db_seconds_total': metrics.seconds['db'],
+            'yatube_template_seconds_total': metrics.seconds['template'],
+            'yatube_cache_hits_total': metrics.counters['cache_hits'],
+            'yatube_cache_misses_total': metrics.counters['cache_misses'],
+            'yatube_page_cache_hits_total':
+                metrics.counters['page_cache_hits'],
+            'yatube_page_cache_misses_total':
+                metrics.counters['page_cache_misses'],
+            'yatube_thumbnails_scheduled_total':
+                metrics.counters['thumbnails_scheduled'],
+            'yatube_tasks_enqueued_total': metrics.counters['tasks_enqueued'],
+            'yatube_db_connections_opened_total':
+                metrics.counters['db_connections_opened'],
+            'yatube_db_connections_reused_total':
+                metrics.counters['db_connections_reused'],
+        }
+        with self.lock:
+            for name, value in values.items():
+                self.values[name, view] += value
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items(),
+                            key=lambda item: (item[0][0], item[0][1] or ''))
+        lines = []
+        previous = None
+        for (name, view), value in values:
+            if name != previous:
+                previous = name
+                lines.append(f'# HELP {name} {self.HELP[name]}')
+                lines.append(f'# TYPE {name} counter')
+            labels = f'{{view="{view}"}}' if view else ''
+            lines.append(f'{name}{labels} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+REGISTRY = Registry()
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with timer('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Бэкенд шаблонов Django, который учитывает время рендера."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
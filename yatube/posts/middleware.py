@@ -0,0 +1,79 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers, slowlog
+
+logger = logging.getLogger('posts.metrics')
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет долю METRICS_SAMPLE_RATE запросов, см. posts.metrics.
+    Стоит первым в MIDDLEWARE, чтобы учесть запросы сессий
+    и аутентификации. Время начала любого запроса — started_at,
+    по нему posts.cache.render_cards отсекает устаревшие карточки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.started_at = time.time()
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with metrics.collect(metrics.RequestMetrics()) as collected, \
+                metrics.counting(collected):
+            collected.counters['db_connections_reused'] = sum(
+                db.connection is not None for db in connections.all())
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        response['Server-Timing'] = collected.server_timing(total)
+        metrics.REGISTRY.record(view, collected, total)
+        logger.info(json.dumps(dict(
+            collected.as_dict(), view=view, path=request.path,
+            status=response.status_code,
+            total_ms=round(total * 1000, 2))))
+        return response
+
+
+class SlowQueryMiddleware:
+    """Отмечает представление, выполняющее запросы, для posts.slowlog."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with slowlog.issued_by(request.path):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slowlog.set_source(request.resolver_match.view_name)
+
+
+class ReplicaPinMiddleware:
+    """
+    После записи в базу закрепляет клиента за основной базой
+    на REPLICA_PIN_SECONDS, см. posts.routers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with routers.track_writes() as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote:
+            response.set_cookie(routers.PIN_COOKIE, '1', httponly=True,
+                                max_age=settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(model, field):
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post.objects.update(comments_count=count_subquery(Comment, 'post'))
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk)
+         for pk in User.objects.values_list('pk', flat=True)],
+        batch_size=500)
+    AuthorStats.objects.update(
+        posts_count=count_subquery(Post, 'author'),
+        followers_count=count_subquery(Follow, 'author'),
+        following_count=count_subquery(Follow, 'user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_indexes_and_unique_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
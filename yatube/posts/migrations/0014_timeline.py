@@ -0,0 +1,66 @@
+# Generated by Django 2.2.6 on 2026-10-18 01:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """
+    Ленты подписчиков как в posts.timeline.rebuild на момент миграции:
+    по одному INSERT … SELECT на пользователя, последние
+    TIMELINE_MAX_LENGTH постов всех авторов без раскладки.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    alias = schema_editor.connection.alias
+    follows = Follow.objects.using(alias)
+    user_ids = follows.order_by().values_list('user_id', flat=True).distinct()
+    for user_id in list(user_ids):
+        authors = (follows.filter(user_id=user_id)
+                   .exclude(author__stats__followers_count__gt=(
+                       settings.TIMELINE_FANOUT_LIMIT))
+                   .values('author_id'))
+        posts = (Post.objects.using(alias).filter(author_id__in=authors)
+                 .order_by('-pub_date', '-pk')
+                 .values_list('pk', 'pub_date')
+                 [:settings.TIMELINE_MAX_LENGTH])
+        sql, params = posts.query.sql_with_params()
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TimelineEntry._meta.db_table} '
+                f'(user_id, post_id, pub_date) SELECT %s, * FROM ({sql})',
+                [user_id, *params])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_thumbnail_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_srcset',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_webp_srcset',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 2.2.6 on 2026-10-18 01:31
+
+import re
+
+from django.db import migrations
+
+# Копия стеммера posts.search на момент миграции: правки модуля
+# не должны менять то, что миграция пишет в индекс.
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+R2 = re.compile(r'^.*?[аеиоуыэюя][^аеиоуыэюя].*?[аеиоуыэюя][^аеиоуыэюя]'
+                r'(.*)$')
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+BATCH_SIZE = 1000
+
+
+def _strip(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+def _step_one(rv):
+    stripped = _strip(PERFECTIVE_GERUND, rv)
+    if stripped != rv:
+        return stripped
+    rv = _strip(REFLEXIVE, rv)
+    stripped = _strip(ADJECTIVE, rv)
+    if stripped != rv:
+        return _strip(PARTICIPLE, stripped)
+    stripped = _strip(VERB, rv)
+    if stripped != rv:
+        return stripped
+    return _strip(NOUN, rv)
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not CYRILLIC.search(word) or match is None:
+        return word
+    start, rv = match.groups()
+    rv = _step_one(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = R2.match(start + rv)
+    if r2 is not None and DERIVATIONAL.search(r2.group(1)):
+        rv = _strip(DERIVATIONAL, rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = _strip(SUPERLATIVE, rv)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def document(text):
+    return ' '.join(stem(word) for word in WORD.findall(text))
+
+
+def batch_documents(batch, comments):
+    texts = {}
+    for post_id, text in (comments.filter(post_id__in=[pk for pk, _ in batch])
+                          .order_by().values_list('post_id', 'text')):
+        texts.setdefault(post_id, []).append(text)
+    for pk, text in batch:
+        yield pk, document(text), document('\n'.join(texts.get(pk, [])))
+
+
+def documents(posts, comments):
+    batch = []
+    for row in posts.order_by('pk').values_list('pk', 'text').iterator():
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield from batch_documents(batch, comments)
+            batch = []
+    yield from batch_documents(batch, comments)
+
+
+def fill_search(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO posts_search (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            documents(Post.objects.using(alias),
+                      Comment.objects.using(alias)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_thumbnail_srcset'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE posts_search USING fts5("
+            "text, comments, tokenize = 'unicode61 remove_diacritics 2')",
+            'DROP TABLE posts_search'),
+        migrations.RunPython(fill_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('args', models.TextField(default='[]')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_at', models.DateTimeField()),
+                ('failed', models.BooleanField(default=False)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['run_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['failed', 'run_at'], name='task_failed_run_at_idx'),
+        ),
+    ]
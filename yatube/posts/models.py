@@ -1,4 +1,8 @@
+import json
+
 from django.db import models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -21,29 +25,78 @@ class Group(models.Model):
         return self.title
 
 
+def count_subquery(model, field):
+    """
+    Коррелированный подзапрос COUNT(*) по строкам model,
+    у которых field ссылается на внешнюю строку.
+    """
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def shift(field, delta):
+    """
+    Выражение для сдвига счётчика field на delta. Счётчик не уходит
+    ниже нуля, даже если разошёлся со строками (bulk_create без
+    сигналов): иначе CHECK (field >= 0) уронил бы само удаление.
+    """
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """
+        Посты для ленты: автор и группа подтягиваются одним JOIN,
+        количество комментариев хранится в самом посте.
+        """
+        return self.select_related('author', 'group')
+
+    def recount_comments(self):
+        return self.update(comments_count=count_subquery(Comment, 'post'))
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст',
                             help_text='Напишите свой пост здесь')
     pub_date = models.DateTimeField('date published', auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name='posts')
+                               related_name='posts', db_index=False)
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, blank=True,
                               null=True, related_name='posts',
+                              db_index=False,
                               verbose_name='Группа',
                               help_text='Выберите группу (не обязательно)')
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    thumbnail_url = models.CharField(max_length=300, blank=True,
+                                     editable=False)
+    thumbnail_srcset = models.TextField(blank=True, editable=False)
+    thumbnail_webp_srcset = models.TextField(blank=True, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, blank=False, null=False,
                              on_delete=models.CASCADE,
-                             related_name='comments',
+                             related_name='comments', db_index=False,
                              verbose_name='Пост с комментариями')
     author = models.ForeignKey(User, blank=False, null=False,
                                on_delete=models.CASCADE,
@@ -57,10 +110,130 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
-                             related_name='follower')
+                             related_name='follower', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='following')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class AuthorStatsManager(models.Manager):
+    def counts_for(self, user_id):
+        return {
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id).count(),
+        }
+
+    def for_user(self, user):
+        """
+        Счётчики автора. Строка создаётся пересчётом,
+        если её ещё нет (например, для старых пользователей).
+        """
+        user_id = getattr(user, 'pk', user)
+        try:
+            return self.get(user_id=user_id)
+        except self.model.DoesNotExist:
+            stats, _ = self.get_or_create(user_id=user_id,
+                                          defaults=self.counts_for(user_id))
+            return stats
+
+    def bump(self, user_id, **deltas):
+        """
+        Сдвигает счётчики на deltas без чтения строки.
+        Отсутствующую строку создаст for_user при первом чтении.
+        """
+        return self.filter(user_id=user_id).update(
+            **{name: shift(name, delta) for name, delta in deltas.items()})
+
+    def rebuild(self):
+        """Пересчитывает счётчики всех пользователей."""
+        existing = self.values('user_id')
+        self.bulk_create(
+            [AuthorStats(user_id=pk) for pk in
+             User.objects.exclude(pk__in=existing).values_list(
+                 'pk', flat=True)],
+            batch_size=500)
+        return self.update(
+            posts_count=count_subquery(Post, 'author'),
+            followers_count=count_subquery(Follow, 'author'),
+            following_count=count_subquery(Follow, 'user'))
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    objects = AuthorStatsManager()
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Пост в материализованной ленте подписок пользователя.
+    Заполняется при публикации (fan-out on write), см. posts.timeline.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди базы, см. posts.tasks. Пока задача
+    выполняется, run_at сдвинут на TASKS['LOCK_SECONDS'] вперёд:
+    задачу упавшего воркера после этого заберёт другой.
+    """
+    name = models.CharField(max_length=200)
+    args = models.TextField(default='[]')
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField()
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name}{tuple(self.arguments)}'
+
+    @property
+    def arguments(self):
+        return json.loads(self.args)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['failed', 'run_at'],
+                         name='task_failed_run_at_idx'),
+        ]
@@ -0,0 +1,120 @@
+"""
+Кэш целых страниц для гостей.
+
+Декоратор cache_for_guests отдаёт гостю готовый ответ из кэша без
+шаблонов и запросов к базе. Гостем считается запрос без cookie
+сессии: так решение принимается, не читая сессию. Страницы
+авторизованных пользователей не кэшируются и получают Cache-Control:
+private, no-cache — браузер сверяет их по ETag (posts.conditional).
+
+Ответ гостю помечается Cache-Control: public, s-maxage, так что его
+может держать и обратный прокси, и Vary: Cookie: с cookie сессии
+прокси идёт за страницей к приложению. Ответы, которые выдали
+CSRF-токен или ставят cookie, не сохраняются.
+
+Ключ страницы включает версии её областей: лента index, группа,
+автор, пост; у страниц автора и поста ещё groups — общая область
+названий групп на их карточках. purge_post и purge сбрасывают версии областей,
+которые затронуло изменение, и все страницы этих областей, с любым
+номером страницы и курсором, перестают находиться в кэше. Версии
+помечены временем: страницу, прочитанную с реплики вскоре после
+сброса, кэш не сохраняет (posts.cache.is_storable).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+
+from . import metrics
+from .cache import is_storable, new_version
+from .models import Post
+
+VERSION_KEY = 'page_version:{}'
+PAGE_KEY = 'page:{}:{}'
+
+
+def is_guest(request):
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def scope_versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def purge(*scopes):
+    """Сбрасывает кэш всех страниц областей scopes."""
+    cache.delete_many([VERSION_KEY.format(scope) for scope in scopes])
+
+
+def post_scopes(post):
+    """Области, где виден пост: лента, его группа, автор и сам пост."""
+    scopes = ['index', f'author:{post.author.username}', f'post:{post.pk}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def purge_post(post_id):
+    post = (Post.objects.filter(pk=post_id).select_related('author', 'group')
+            .only('author__username', 'group__slug').first())
+    if post is not None:
+        purge(*post_scopes(post))
+
+
+def page_key(request, versions):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    version = hashlib.md5(''.join(versions).encode())
+    return PAGE_KEY.format(version.hexdigest(), url)
+
+
+def is_cacheable(request, response, versions):
+    return (response.status_code == 200 and not response.streaming
+            and all(is_storable(version) for version in versions)
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def cache_for_guests(*scopes):
+    """
+    Кэш страницы для гостей на PAGE_CACHE_TIMEOUT секунд. scopes —
+    шаблоны областей страницы, подставляются аргументы представления:
+    cache_for_guests('group:{slug}'). Ставится под read_only, чтобы
+    не сохранять страницу, прочитанную с отстающей реплики.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or not is_guest(request)):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            versions = scope_versions([scope.format(**kwargs)
+                                       for scope in scopes])
+            key = page_key(request, versions)
+            response = cache.get(key)
+            if response is not None:
+                metrics.incr('page_cache_hits')
+                return get_conditional_response(
+                    request, etag=response.get('ETag'), response=response)
+            metrics.incr('page_cache_misses')
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if not is_cacheable(request, response, versions):
+                return response
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.PAGE_CACHE_PROXY_SECONDS)
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,215 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .cache import cached
+
+
+class FeedPaginator(Paginator):
+    """
+    Paginator с укороченным списком номеров страниц:
+    первая и последняя страницы плюс окно вокруг текущей.
+    С cache_key число объектов и id на страницах берутся
+    из общего кэша (posts.cache.cached), а сами посты
+    читаются по первичному ключу.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return Paginator.count.func(self)
+        return cached(f'{self.cache_key}:count',
+                      lambda: Paginator.count.func(self))
+
+    def page(self, number):
+        if self.cache_key is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        ids = cached(
+            f'{self.cache_key}:{self.per_page}:{number}',
+            lambda: list(self.object_list.values_list('pk', flat=True)
+                         [bottom:top]))
+        objects = self.object_list.filter(pk__in=ids).in_bulk()
+        return self._get_page([objects[pk] for pk in ids if pk in objects],
+                              number, self)
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """
+        Номера страниц для шаблона, пропуски заменены на ELLIPSIS.
+        Длина результата не зависит от общего числа страниц.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CursorPage:
+    """
+    Страница ленты, открытая по курсору.
+    Повторяет интерфейс django.core.paginator.Page,
+    который нужен шаблонам: итерация, has_next, has_previous.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по (pub_date, id) от новых к старым.
+    Не выполняет ни COUNT(*), ни OFFSET: любая страница — это
+    диапазонный запрос по индексу от позиции курсора.
+    Поле даты берётся из сортировки queryset, так что ленту можно
+    листать и по аннотации с той же датой (см. timeline.posts_for).
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        ordering = (object_list.query.order_by
+                    or object_list.model._meta.ordering)
+        self.date_field = ordering[0].lstrip('-')
+
+    @staticmethod
+    def encode_cursor(post, backwards=False):
+        payload = json.dumps([post.pub_date.isoformat(), post.pk,
+                              int(backwards)])
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Возвращает (pub_date, id, backwards)
+        или None, если курсор повреждён.
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            pub_date, pk, backwards = json.loads(raw)
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            return None
+        if pub_date is None:
+            return None
+        return pub_date, pk, bool(backwards)
+
+    def get_page(self, cursor=None):
+        """
+        Страница после (или до) курсора. Пустой и некорректный
+        курсор дают первую страницу, как Paginator.get_page.
+        """
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._page_after(None)
+        pub_date, pk, backwards = position
+        if backwards:
+            return self._page_before(pub_date, pk)
+        return self._page_after((pub_date, pk))
+
+    def _page_after(self, position):
+        field = self.date_field
+        queryset = self.object_list.order_by(f'-{field}', '-pk')
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': pub_date})
+                | Q(**{field: pub_date, 'pk__lt': pk}))
+        rows = list(queryset[:self.per_page + 1])
+        object_list = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = self.encode_cursor(object_list[-1])
+        if position is not None and object_list:
+            previous_cursor = self.encode_cursor(object_list[0],
+                                                 backwards=True)
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+    def _page_before(self, pub_date, pk):
+        field = self.date_field
+        queryset = self.object_list.order_by(field, 'pk').filter(
+            Q(**{f'{field}__gt': pub_date})
+            | Q(**{field: pub_date, 'pk__gt': pk}))
+        rows = list(queryset[:self.per_page + 1])
+        object_list = rows[:self.per_page][::-1]
+        if not object_list:
+            return self._page_after(None)
+        previous_cursor = None
+        if len(rows) > self.per_page:
+            previous_cursor = self.encode_cursor(object_list[0],
+                                                 backwards=True)
+        next_cursor = self.encode_cursor(object_list[-1])
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+
+def paginate(request, object_list, cursor=None, cache_key=None):
+    """
+    Страница ленты для запроса. Режим выбирается настройкой
+    POSTS_CURSOR_PAGINATION, вью может переопределить его
+    аргументом cursor. cache_key включает общий кэш страниц
+    (только для постраничного режима).
+    """
+    if cursor is None:
+        cursor = settings.POSTS_CURSOR_PAGINATION
+    if cursor:
+        paginator = CursorPaginator(object_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = FeedPaginator(object_list, settings.POSTS_PER_PAGE,
+                              cache_key=cache_key)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,87 @@
+"""
+Чтение с реплик базы.
+
+Представления с декоратором read_only читают из одной из реплик
+DATABASE_REPLICAS, выбранной на весь запрос; всё остальное, включая
+любую запись, идёт в основную базу default. Реплика отстаёт
+от основной базы, поэтому запрос, который что-то записал, ставит
+cookie PIN_COOKIE на REPLICA_PIN_SECONDS (ReplicaPinMiddleware):
+пока она есть, автор читает из основной базы и видит свои изменения.
+
+Поиск (posts.search) и ленты подписок при пересборке работают
+с connection напрямую и всегда идут в основную базу.
+
+Общий кэш (posts.cache, posts.pagecache) не принимает от чтения
+с реплики то, что изменилось за последние REPLICA_PIN_SECONDS:
+реплика могла ещё не получить изменение, а ключ уже новый.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'primary_db'
+
+_local = threading.local()
+
+
+def current_replica():
+    return getattr(_local, 'replica', None)
+
+
+@contextmanager
+def replica(alias=None):
+    """Чтение из реплики alias (по умолчанию случайной) до конца блока."""
+    previous = current_replica()
+    _local.replica = alias or random.choice(settings.DATABASE_REPLICAS)
+    try:
+        yield _local.replica
+    finally:
+        _local.replica = previous
+
+
+def may_lag(changed):
+    """Реплика потока может не видеть изменение от времени changed."""
+    return (current_replica() is not None
+            and changed > time.time() - settings.REPLICA_PIN_SECONDS)
+
+
+def read_only(view):
+    """Представление читает из реплики, если автор не закреплён."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.DATABASE_REPLICAS
+                or PIN_COOKIE in request.COOKIES):
+            return view(request, *args, **kwargs)
+        with replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def track_writes():
+    """Отмечает, писал ли в базу код внутри блока."""
+    _local.wrote = False
+    try:
+        yield _local
+    finally:
+        del _local.wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica() or 'default'
+
+    def db_for_write(self, model, **hints):
+        if hasattr(_local, 'wrote'):
+            _local.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,215 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс — виртуальная таблица SQLite FTS5 posts_search (миграция
+0017_search): одна строка на пост, rowid равен id поста, колонки text
+(текст поста) и comments (тексты всех комментариев). В индекс пишутся
+не слова, а их основы (stem), поэтому «книги» находит «книгой».
+Таблица обновляется сигналами при сохранении постов, а колонка
+comments — фоновой задачей posts.tasks после сохранения комментария.
+
+Релевантность — bm25, текст поста весит больше комментариев.
+Ранжируются только SEARCH_MAX_RESULTS самых новых совпадений: FTS5
+отдаёт их по убыванию rowid без просмотра всего списка совпадений,
+так что время запроса не растёт с размером базы.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import tasks
+from .models import Comment, Post
+
+TABLE = 'posts_search'
+WEIGHTS = (2.0, 1.0)
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+# Стеммер Портера для русского языка (Snowball)
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+R2 = re.compile(r'^.*?[аеиоуыэюя][^аеиоуыэюя].*?[аеиоуыэюя][^аеиоуыэюя]'
+                r'(.*)$')
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def _strip(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+def _step_one(rv):
+    stripped = _strip(PERFECTIVE_GERUND, rv)
+    if stripped != rv:
+        return stripped
+    rv = _strip(REFLEXIVE, rv)
+    stripped = _strip(ADJECTIVE, rv)
+    if stripped != rv:
+        return _strip(PARTICIPLE, stripped)
+    stripped = _strip(VERB, rv)
+    if stripped != rv:
+        return stripped
+    return _strip(NOUN, rv)
+
+
+def stem(word):
+    """Основа русского слова, остальные слова возвращаются как есть."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if not CYRILLIC.search(word) or match is None:
+        return word
+    start, rv = match.groups()
+    rv = _step_one(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = R2.match(start + rv)
+    if r2 is not None and DERIVATIONAL.search(r2.group(1)):
+        rv = _strip(DERIVATIONAL, rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = _strip(SUPERLATIVE, rv)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD.findall(text)]
+
+
+def document(text):
+    """Текст в том виде, в котором он хранится в индексе."""
+    return ' '.join(tokenize(text))
+
+
+def match_expression(query):
+    """
+    Выражение MATCH для запроса пользователя: все слова запроса,
+    каждое в кавычках, чтобы синтаксис FTS5 в запросе не работал.
+    """
+    return ' '.join(f'"{token}"' for token in dict.fromkeys(tokenize(query)))
+
+
+def index_post(post_id, text, created=False):
+    with connection.cursor() as cursor:
+        if not created:
+            cursor.execute(f'UPDATE {TABLE} SET text = %s WHERE rowid = %s',
+                           [document(text), post_id])
+            if cursor.rowcount:
+                return
+        comments = '' if created else comments_document(post_id)
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, comments) '
+            f'VALUES (%s, %s, %s)', [post_id, document(text), comments])
+
+
+def comments_document(post_id):
+    texts = Comment.objects.filter(post_id=post_id).values_list('text',
+                                                                flat=True)
+    return document('\n'.join(texts))
+
+
+@tasks.task
+def index_comments(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {TABLE} SET comments = %s WHERE rowid = %s',
+                       [comments_document(post_id), post_id])
+
+
+def remove_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def _batch_documents(batch, comments):
+    texts = {}
+    for post_id, text in (comments.filter(post_id__in=[pk for pk, _ in batch])
+                          .order_by().values_list('post_id', 'text')):
+        texts.setdefault(post_id, []).append(text)
+    for pk, text in batch:
+        yield pk, document(text), document('\n'.join(texts.get(pk, [])))
+
+
+def documents(posts, comments, batch_size=1000):
+    """Строки индекса (id, text, comments) пачками по batch_size постов."""
+    batch = []
+    for row in posts.order_by('pk').values_list('pk', 'text').iterator():
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield from _batch_documents(batch, comments)
+            batch = []
+    yield from _batch_documents(batch, comments)
+
+
+def fill(cursor, posts, comments):
+    """Заполняет индекс заново, возвращает число постов."""
+    cursor.execute(f'DELETE FROM {TABLE}')
+    cursor.executemany(
+        f'INSERT INTO {TABLE} (rowid, text, comments) VALUES (%s, %s, %s)',
+        documents(posts, comments))
+    return cursor.rowcount
+
+
+def rebuild():
+    with transaction.atomic(), connection.cursor() as cursor:
+        return fill(cursor, Post.objects.all(), Comment.objects.all())
+
+
+class SearchResults:
+    """
+    Найденные посты от более релевантных к менее релевантным.
+    Поддерживает count() и срезы, поэтому подходит для Paginator.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def _matches(self):
+        # самые новые совпадения, их FTS5 читает без сортировки
+        return (f'SELECT rowid, bm25({TABLE}, %s, %s) AS score '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY rowid DESC LIMIT %s',
+                [*WEIGHTS, self.expression, settings.SEARCH_MAX_RESULTS])
+
+    def count(self):
+        if not self.expression:
+            return 0
+        sql, params = self._matches()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql})', params)
+            return cursor.fetchone()[0]
+
+    def ids(self, offset, limit):
+        if not self.expression:
+            return []
+        sql, params = self._matches()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM ({sql}) '
+                f'ORDER BY score, rowid DESC LIMIT %s OFFSET %s',
+                [*params, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        ids = self.ids(offset, index.stop - offset)
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import pagecache, search, tasks, thumbnails, timeline
+from .cache import invalidate_cards, invalidate_feeds, invalidate_groups
+from .models import AuthorStats, Comment, Follow, Group, Post, shift
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.bump(instance.author_id, posts_count=1)
+        tasks.enqueue(timeline.publish, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    AuthorStats.objects.bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=shift('comments_count', 1))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comments_count=shift('comments_count', -1))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.bump(instance.author_id, followers_count=1)
+        AuthorStats.objects.bump(instance.user_id, following_count=1)
+        tasks.enqueue(timeline.backfill, instance.user_id,
+                      instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorStats.objects.bump(instance.author_id, followers_count=-1)
+    AuthorStats.objects.bump(instance.user_id, following_count=-1)
+    tasks.enqueue(timeline.unfollow, instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, update_fields=None,
+                   **kwargs):
+    # пост могут перенести в другую группу: прежнюю тоже надо сбросить
+    if raw or instance._state.adding or (
+            update_fields is not None and 'group' not in update_fields):
+        return
+    instance.previous_group_slug = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group__slug', flat=True).first())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_cards([instance.pk])
+        invalidate_feeds()
+        scopes = pagecache.post_scopes(instance)
+        previous = getattr(instance, 'previous_group_slug', None)
+        if previous:
+            scopes.append(f'group:{previous}')
+        pagecache.purge(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def post_thumbnails_deleted(sender, instance, **kwargs):
+    thumbnails.delete_variants(thumbnails.variant_names(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comments_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_cards([instance.post_id])
+        pagecache.purge_post(instance.post_id)
+
+
+def purge_group(group, *slugs):
+    """
+    Сбрасывает карточки и страницы постов группы, не перебирая посты:
+    одна версия группы и области страниц; slugs — адреса группы.
+    """
+    # название группы есть в карточках её постов на любых страницах
+    invalidate_groups([group.pk])
+    pagecache.purge('index', 'groups', *(f'group:{slug}' for slug in slugs))
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance.previous_slug = (Group.objects.filter(pk=instance.pk)
+                                  .values_list('slug', flat=True).first())
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        previous = getattr(instance, 'previous_slug', None)
+        purge_group(instance, instance.slug,
+                    *([previous] if previous else []))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # посты отвязываются UPDATE без сигналов Post; их карточки без
+    # группы получают другой ключ, страницы сбрасывает purge_group
+    invalidate_feeds()
+    purge_group(instance, instance.slug)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, raw=False, **kwargs):
+    # счётчики подписчиков видны на страницах автора и его постов
+    if not raw:
+        pagecache.purge(f'author:{instance.author.username}')
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    if not raw and (update_fields is None or 'text' in update_fields):
+        search.index_post(instance.pk, instance.text, created)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comments_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.enqueue(search.index_comments, instance.post_id)
@@ -0,0 +1,202 @@
+"""
+Журнал медленных запросов к базе.
+
+Обёртка execute SlowQueryLog ставится на каждое соединение с базой
+(сигнал connection_created) и замеряет все запросы, а не только
+попавшие в выборку posts.metrics. Запрос дольше SLOW_QUERY_THRESHOLD_MS
+пишется в лог posts.slowlog вместе с представлением, которое его
+выполнило (его отмечает SlowQueryMiddleware), и планом запроса:
+для SELECT при первой встрече выполняется EXPLAIN QUERY PLAN.
+
+Запросы группируются по отпечатку — SQL без значений, где списки
+IN (...) любой длины совпадают. SLOW_QUERIES копит по отпечаткам
+число, суммарное и максимальное время и представления; самые
+дорогие отдаёт страница /metrics/slow/. Данные живут в памяти
+процесса, как и REGISTRY.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger('posts.slowlog')
+_local = threading.local()
+
+MAX_FINGERPRINTS = 500
+LITERALS = re.compile(
+    r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\"s\d+_x\d+\"")
+IN_LISTS = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """SQL без значений: запросы, отличающиеся только id, совпадают."""
+    sql = LITERALS.sub('?', SPACES.sub(' ', sql.strip()))
+    return IN_LISTS.sub('IN (...)', sql)
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def source():
+    """Представление, которое выполняет запросы в этом потоке."""
+    return getattr(_local, 'source', None)
+
+
+@contextmanager
+def issued_by(name):
+    previous, _local.source = source(), name
+    try:
+        yield
+    finally:
+        _local.source = previous
+
+
+def set_source(name):
+    _local.source = name
+
+
+class SlowQuery:
+    def __init__(self, key, sql):
+        self.fingerprint = key
+        self.sql = normalize(sql)
+        self.count = 0
+        self.seconds = 0
+        self.max_seconds = 0
+        self.views = Counter()
+        self.plan = None
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'sql': self.sql,
+            'count': self.count,
+            'total_ms': round(self.seconds * 1000, 2),
+            'max_ms': round(self.max_seconds * 1000, 2),
+            'views': dict(self.views.most_common()),
+            'plan': self.plan,
+        }
+
+
+class SlowQueries:
+    """Медленные запросы процесса, сгруппированные по отпечаткам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def add(self, sql, seconds, view):
+        """Учитывает запрос, возвращает его SlowQuery."""
+        key = fingerprint(sql)
+        with self.lock:
+            query = self.queries.get(key)
+            if query is None:
+                if len(self.queries) >= MAX_FINGERPRINTS:
+                    cheapest = min(self.queries.values(),
+                                   key=lambda item: item.seconds)
+                    del self.queries[cheapest.fingerprint]
+                query = self.queries[key] = SlowQuery(key, sql)
+            query.count += 1
+            query.seconds += seconds
+            query.max_seconds = max(query.max_seconds, seconds)
+            query.views[view] += 1
+        return query
+
+    def top(self, limit=20):
+        """Самые дорогие отпечатки по суммарному времени."""
+        with self.lock:
+            queries = sorted(self.queries.values(),
+                             key=lambda item: item.seconds, reverse=True)
+            return [query.as_dict() for query in queries[:limit]]
+
+    def render(self, limit=20):
+        lines = []
+        for number, query in enumerate(self.top(limit), 1):
+            lines.append(
+                f'{number}. {query["fingerprint"]}: {query["count"]} раз, '
+                f'всего {query["total_ms"]} мс, '
+                f'максимум {query["max_ms"]} мс')
+            lines.append(f'   {query["sql"]}')
+            views = ', '.join(f'{view} ×{count}'
+                              for view, count in query['views'].items())
+            lines.append(f'   представления: {views}')
+            for row in query['plan'] or ():
+                lines.append(f'   | {row}')
+            lines.append('')
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self.lock:
+            self.queries.clear()
+
+
+SLOW_QUERIES = SlowQueries()
+
+
+def explain(connection, sql, params):
+    """План запроса; сам EXPLAIN в журнал не попадает."""
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except DatabaseError as error:
+        return [f'EXPLAIN не удался: {error}']
+    finally:
+        _local.explaining = False
+
+
+def is_select(sql):
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+class SlowQueryLog:
+    """Обёртка execute, которая пишет запросы дольше порога."""
+
+    def __call__(self, execute, sql, params, many, context):
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is None or getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= threshold:
+            self.record(sql, params, many, context, elapsed)
+        return result
+
+    def record(self, sql, params, many, context, elapsed):
+        view = source() or 'unknown'
+        query = SLOW_QUERIES.add(sql, elapsed, view)
+        if query.plan is None and not many and is_select(sql):
+            query.plan = explain(context['connection'], sql, params)
+        REGISTRY.add('yatube_slow_queries_total', 1, view)
+        # без параметров: в них пароли, ключи и данные сессий
+        logger.warning(json.dumps({
+            'fingerprint': query.fingerprint,
+            'duration_ms': round(elapsed * 1000, 2),
+            'view': view,
+            'sql': sql,
+            'plan': query.plan,
+        }, ensure_ascii=False))
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    # в начало списка: execute_wrapper() снимает последнюю обёртку,
+    # а соединение может открыться внутри него
+    wrappers = connection.execute_wrappers
+    if not any(isinstance(wrapper, SlowQueryLog) for wrapper in wrappers):
+        wrappers.insert(0, SlowQueryLog())
@@ -0,0 +1,195 @@
+"""
+Фоновые задачи.
+
+Функция с декоратором task выполняется вне запроса: enqueue(function,
+*args) ставит её в очередь, и запрос на запись отвечает, как только
+закоммичена его транзакция. Аргументы — значения JSON, обычно pk.
+Куда уходит задача, задаёт TASKS['BACKEND']:
+
+* database — строка Task в той же транзакции, что и сама запись:
+  откат отменяет задачу, а закоммиченная задача переживает падение
+  процесса. Задачи выполняют процессы manage.py run_workers;
+* thread — пул из TASKS['THREADS'] потоков процесса после коммита,
+  без отдельных воркеров. Упавшая задача повторяется в том же
+  процессе по таймеру и теряется, если процесс завершится; после
+  MAX_ATTEMPTS попыток она записывается в таблицу с failed=True;
+* eager — сразу в текущем потоке, для тестов и отладки.
+
+Упавшая задача повторяется через RETRY_DELAY * 2 ** (попытка - 1)
+секунд, после MAX_ATTEMPTS попыток остаётся в таблице с failed=True.
+"""
+import json
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .models import Task
+
+logger = logging.getLogger('posts.tasks')
+
+_executor = None
+
+
+def task(function):
+    """Разрешает ставить функцию в очередь по её полному имени."""
+    function.task_name = f'{function.__module__}.{function.__qualname__}'
+    return function
+
+
+def resolve(name):
+    function = import_string(name)
+    if getattr(function, 'task_name', None) != name:
+        raise ImproperlyConfigured(f'{name} не объявлена как task')
+    return function
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(settings.TASKS['THREADS'],
+                                       thread_name_prefix='tasks')
+    return _executor
+
+
+def execute(name, args):
+    """Выполняет задачу и считает её в REGISTRY."""
+    started = time.perf_counter()
+    try:
+        return resolve(name)(*args)
+    except Exception:
+        metrics.REGISTRY.add('yatube_task_failures_total', 1, name)
+        raise
+    finally:
+        metrics.REGISTRY.add('yatube_tasks_total', 1, name)
+        metrics.REGISTRY.add('yatube_task_seconds_total',
+                             time.perf_counter() - started, name)
+
+
+def retry_delay(attempts):
+    return settings.TASKS['RETRY_DELAY'] * 2 ** (attempts - 1)
+
+
+def retry_at(attempts):
+    return timezone.now() + timedelta(seconds=retry_delay(attempts))
+
+
+def enqueue(function, *args):
+    """Ставит function(*args) в очередь TASKS['BACKEND']."""
+    name = function.task_name
+    args = json.loads(json.dumps(args))
+    backend = settings.TASKS['BACKEND']
+    metrics.incr('tasks_enqueued')
+    if backend == 'eager':
+        execute(name, args)
+    elif backend == 'thread':
+        transaction.on_commit(lambda: _submit(name, args))
+    elif backend == 'database':
+        Task.objects.create(name=name, args=json.dumps(args),
+                            run_at=timezone.now())
+    else:
+        raise ImproperlyConfigured(f'Неизвестный TASKS: {backend}')
+
+
+def _submit(name, args, attempt=1):
+    executor().submit(_run_in_thread, name, args, attempt)
+
+
+def _run_in_thread(name, args, attempt):
+    try:
+        run_with_retries(name, args, attempt)
+    finally:
+        connection.close()
+
+
+def run_with_retries(name, args, attempt=1):
+    """
+    Попытка attempt задачи бэкенда thread. Повтор ставится таймером
+    в том же процессе: воркеров run_workers при этом бэкенде нет.
+    """
+    try:
+        execute(name, args)
+    except Exception:
+        logger.exception('Задача %s%s упала, попытка %s', name,
+                         tuple(args), attempt)
+        if attempt >= settings.TASKS['MAX_ATTEMPTS']:
+            Task.objects.create(name=name, args=json.dumps(args),
+                                attempts=attempt, failed=True,
+                                run_at=timezone.now(),
+                                last_error=traceback.format_exc())
+            return
+        timer = threading.Timer(retry_delay(attempt), _submit,
+                                (name, args, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+
+def claim():
+    """
+    Забирает ближайшую задачу, которой пора выполняться. UPDATE
+    с условием на run_at проходит только у одного воркера.
+    """
+    now = timezone.now()
+    due = (Task.objects.filter(failed=False, run_at__lte=now)
+           .values_list('pk', flat=True)[:10])
+    locked_until = now + timedelta(seconds=settings.TASKS['LOCK_SECONDS'])
+    for pk in list(due):
+        claimed = Task.objects.filter(pk=pk, run_at__lte=now).update(
+            run_at=locked_until, attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.filter(pk=pk).first()
+    return None
+
+
+def run(claimed):
+    """Выполняет забранную задачу: удаляет её или планирует повтор."""
+    try:
+        execute(claimed.name, claimed.arguments)
+    except Exception:
+        logger.exception('Задача %s упала, попытка %s', claimed,
+                         claimed.attempts)
+        failed = claimed.attempts >= settings.TASKS['MAX_ATTEMPTS']
+        Task.objects.filter(pk=claimed.pk).update(
+            failed=failed, last_error=traceback.format_exc(),
+            run_at=timezone.now() if failed else retry_at(claimed.attempts))
+        return False
+    Task.objects.filter(pk=claimed.pk).delete()
+    return True
+
+
+def release_connections():
+    # как между запросами: воркер живёт долго, устаревшие соединения
+    # закрываются, но не посреди транзакции вызывающего кода
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def work(stop=None, burst=False):
+    """
+    Цикл воркера: выполняет задачи, пока не выставлено событие stop.
+    С burst=True возвращается, когда очередь опустела. Возвращает
+    число успешно выполненных задач.
+    """
+    stop = stop or threading.Event()
+    done = 0
+    while not stop.is_set():
+        release_connections()
+        claimed = claim()
+        if claimed is None:
+            if burst:
+                break
+            stop.wait(settings.TASKS['POLL_INTERVAL'])
+            continue
+        done += run(claimed)
+    release_connections()
+    return done
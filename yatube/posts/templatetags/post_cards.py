@@ -0,0 +1,26 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов ленты из кэша, см. posts.cache."""
+    card = context.template.engine.get_template('post_item.html')
+
+    def render(post):
+        with context.push(post=post):
+            return card.render(context)
+
+    user = context.get('user')
+    viewer_id = user.pk if user is not None else None
+    since = getattr(context.get('request'), 'started_at', None)
+    return mark_safe(''.join(render_cards(posts, render, viewer_id, since)))
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    return post_cards(context, [post])
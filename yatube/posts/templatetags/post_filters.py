@@ -0,0 +1,28 @@
+from urllib.parse import quote
+
+from django import template
+from django.http import QueryDict
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    return list(page.paginator.get_elided_page_range(page.number))
+
+
+@register.simple_tag(takes_context=True)
+def page_query(context, name, value):
+    """
+    Строка запроса для ссылки пагинатора: параметры текущего
+    запроса (например, q поиска) с заменённым номером страницы.
+    """
+    if 'page_query' not in context.render_context:
+        request = context.get('request')
+        query = request.GET.copy() if request else QueryDict(mutable=True)
+        query.pop('page', None)
+        query.pop('cursor', None)
+        prefix = query.urlencode()
+        context.render_context['page_query'] = prefix + '&' if prefix else ''
+    prefix = context.render_context['page_query']
+    return f'?{prefix}{name}={quote(str(value))}'
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PER_PAGE=10)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Ragnar', first_name='Рагнар', last_name='Лодброк')
+        cls.reader = User.objects.create_user(username='Floki')
+        cls.group = Group.objects.create(title='Викинги', slug='vikings',
+                                         description='Северяне')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [Post.objects.create(text=f'Пост {number}',
+                                         author=cls.author, group=cls.group)
+                     for number in range(15)]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_index_cursor_pagination(self):
+        """Лента листается по курсору и отдаёт каждый пост один раз"""
+        response = self.client.get(reverse('api_index'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()
+        ids = [post['id'] for post in data['results'] + second['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        self.assertIsNone(second['next'])
+
+    def test_embedded_author_and_group(self):
+        """Автор и группа приходят в посте, вся страница — одним запросом"""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api_index')).json()
+        post = data['results'][0]
+        self.assertEqual(post['author'], {'id': self.author.pk,
+                                          'username': 'Ragnar',
+                                          'full_name': 'Рагнар Лодброк'})
+        self.assertEqual(post['group']['slug'], 'vikings')
+        self.assertEqual(post['comments_count'], 1)
+        selects = [query['sql'] for query in queries
+                   if 'FROM "posts_post"' in query['sql']
+                   and 'LIMIT 11' in query['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('"auth_user"', selects[0])
+        self.assertIn('"posts_group"', selects[0])
+
+    def test_sparse_fields(self):
+        """fields выбирает поля ответа и колонки запроса"""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api_index'),
+                                   {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        sql = next(query['sql'] for query in queries
+                   if 'LIMIT 11' in query['sql'])
+        self.assertNotIn('"auth_user"', sql)
+        self.assertNotIn('"thumbnail_srcset"', sql)
+
+    def test_unknown_fields(self):
+        """Неизвестное поле — ошибка 400 в JSON"""
+        response = self.client.get(reverse('api_index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_group_and_profile(self):
+        """Группа и профиль отдают описание группы и счётчики автора"""
+        group = self.client.get(
+            reverse('api_group_posts', args=['vikings'])).json()
+        self.assertEqual(group['group']['description'], 'Северяне')
+        self.assertEqual(len(group['results']), 10)
+        profile = self.client.get(
+            reverse('api_profile', args=['Ragnar'])).json()
+        self.assertEqual(profile['author']['posts_count'], 15)
+        self.assertEqual(profile['author']['followers_count'], 1)
+        self.assertFalse(profile['author']['following'])
+
+    def test_post_with_comments(self):
+        """Пост отдаётся с комментариями и их авторами"""
+        data = self.client.get(
+            reverse('api_post', args=['Ragnar', self.post.pk])).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments'][0]['author']['username'], 'Floki')
+
+    def test_not_found(self):
+        """Несуществующий объект — 404 в JSON"""
+        for url in (reverse('api_group_posts', args=['missing']),
+                    reverse('api_profile', args=['missing']),
+                    reverse('api_post', args=['Ragnar', 999])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_follow_index(self):
+        """Лента подписок требует входа"""
+        url = reverse('api_follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(data['results'][0], {'id': self.post.pk})
+
+    def test_payload_smaller_than_html(self):
+        """JSON ленты заметно меньше HTML-страницы"""
+        html = self.client.get(reverse('index')).content
+        data = self.client.get(reverse('api_index')).content
+        self.assertLess(len(data) * 2, len(html))
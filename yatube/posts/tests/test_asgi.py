@@ -0,0 +1,109 @@
+import asyncio
+import io
+
+from django.test import SimpleTestCase, override_settings
+
+from yatube.asgi import WsgiToAsgi, application, wsgi_environ
+
+
+def call(scope, messages, app=application):
+    """Ответ приложения ASGI на запрос из сообщений messages."""
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def http_scope(path, method='GET', headers=()):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': list(headers),
+            'client': ('10.0.0.1', 5000), 'server': ('testserver', 80)}
+
+
+class AsgiTest(SimpleTestCase):
+    def test_environ(self):
+        """Запрос ASGI переводится в окружение WSGI"""
+        environ = wsgi_environ(
+            dict(http_scope('/группа/', 'POST', [
+                (b'content-type', b'text/plain'),
+                (b'x-tag', b'a'), (b'x-tag', b'b')]),
+                query_string=b'page=2'),
+            io.BytesIO(b'body'))
+        self.assertEqual(environ['PATH_INFO'],
+                         '/группа/'.encode().decode('latin-1'))
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+    def test_response(self):
+        """Ответ Django отправляется клиенту сообщениями ASGI"""
+        sent = call(http_scope('/about/author/'),
+                    [{'type': 'http.request', 'body': b'',
+                      'more_body': False}])
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertIn(b'</html>', body)
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_disconnect(self):
+        """Если клиент ушёл до конца запроса, Django не вызывается"""
+        sent = call(http_scope('/about/author/', 'POST'),
+                    [{'type': 'http.request', 'body': b'a',
+                      'more_body': True},
+                     {'type': 'http.disconnect'}])
+        self.assertEqual(sent, [])
+
+    @override_settings(ASGI_MAX_BODY_BYTES=10)
+    def test_body_too_large(self):
+        """Тело больше ASGI_MAX_BODY_BYTES по Content-Length не читается"""
+        messages = [{'type': 'http.request', 'body': b'a' * 11,
+                     'more_body': False}]
+        sent = call(http_scope('/new/', 'POST',
+                               [(b'content-length', b'11')]), messages)
+        self.assertEqual(sent[0]['status'], 413)
+        self.assertEqual(len(messages), 1)
+
+    @override_settings(ASGI_MAX_BODY_BYTES=10)
+    def test_streamed_body_too_large(self):
+        """Без Content-Length приём обрывается на превышении лимита"""
+        messages = [{'type': 'http.request', 'body': b'a' * 6,
+                     'more_body': True} for _ in range(3)]
+        sent = call(http_scope('/new/', 'POST'), messages)
+        self.assertEqual(sent[0]['status'], 413)
+        self.assertEqual(len(messages), 1)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=4)
+    def test_body_spooled_to_disk(self):
+        """Тело больше FILE_UPLOAD_MAX_MEMORY_SIZE доходит до Django"""
+        bodies = []
+
+        def wsgi_application(environ, start_response):
+            bodies.append(environ['wsgi.input'].read())
+            start_response('200 OK', [])
+            return []
+
+        call(http_scope('/new/', 'POST'),
+             [{'type': 'http.request', 'body': b'12345',
+               'more_body': True},
+              {'type': 'http.request', 'body': b'678'}],
+             app=WsgiToAsgi(wsgi_application, 1))
+        self.assertEqual(bodies, [b'12345678'])
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки"""
+        sent = call({'type': 'lifespan'}, [{'type': 'lifespan.startup'},
+                                           {'type': 'lifespan.shutdown'}],
+                    app=WsgiToAsgi(None, 1))
+        self.assertEqual(sent, [{'type': 'lifespan.startup.complete'},
+                                {'type': 'lifespan.shutdown.complete'}])
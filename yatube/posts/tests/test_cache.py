@@ -0,0 +1,139 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import cache as feed_cache
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class CachedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_reused(self):
+        """Значение считается один раз до истечения срока"""
+        self.assertEqual(feed_cache.cached('key', self.compute), 1)
+        self.assertEqual(feed_cache.cached('key', self.compute), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_feeds(self):
+        """После invalidate_feeds значение пересчитывается"""
+        feed_cache.cached('key', self.compute)
+        feed_cache.invalidate_feeds()
+        self.assertEqual(feed_cache.cached('key', self.compute), 2)
+
+    def test_stale_value_while_refreshing(self):
+        """Пока другой процесс пересчитывает, отдаётся прежнее значение"""
+        feed_cache.cached('key', self.compute)
+        feed_cache.invalidate_feeds()
+        cache.add(feed_cache.LOCK_KEY.format('key'), 1)
+        self.assertEqual(feed_cache.cached('key', self.compute), 1)
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(FEED_CACHE_LOCK_TIMEOUT=0.2)
+    def test_cold_key_waits_for_refresh(self):
+        """Холодный ключ под чужим пересчётом ждёт, а не считает сам"""
+        cache.add(feed_cache.LOCK_KEY.format('key'), 1)
+
+        def refreshed(seconds):
+            cache.set('key', ('готово', time.time() + 20, 0,
+                              feed_cache.feed_generation()))
+
+        with mock.patch.object(feed_cache.time, 'sleep', refreshed):
+            self.assertEqual(feed_cache.cached('key', self.compute),
+                             'готово')
+        self.assertEqual(self.calls, 0)
+
+    def test_early_refresh(self):
+        """Дорогое значение пересчитывается раньше срока"""
+        cache.set('key', (0, time.time() + 1, 60,
+                          feed_cache.feed_generation()))
+        with mock.patch.object(feed_cache.random, 'random',
+                               return_value=0.5):
+            self.assertEqual(feed_cache.cached('key', self.compute), 1)
+
+
+class CardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='Ragnar')
+        self.post = Post.objects.create(text='текст', author=user)
+
+    def test_card_cached(self):
+        """Карточка рисуется один раз"""
+        since = time.time()
+        feed_cache.render_cards([self.post], lambda post: 'первая', None,
+                                since)
+        self.assertEqual(
+            feed_cache.render_cards([self.post], lambda post: 'вторая',
+                                    None, time.time()),
+            ['первая'])
+
+    def test_card_changed_during_request_not_cached(self):
+        """Пост, изменённый после начала запроса, не оседает в кэше"""
+        since = time.time()
+        loaded = Post.objects.get(pk=self.post.pk)
+        # параллельное сохранение уже после чтения строки
+        feed_cache.invalidate_cards([self.post.pk])
+        self.assertEqual(
+            feed_cache.render_cards([loaded], lambda post: 'старая', None,
+                                    since),
+            ['старая'])
+        self.assertEqual(
+            feed_cache.render_cards([self.post], lambda post: 'новая',
+                                    None, time.time()),
+            ['новая'])
+
+    def test_group_change_replaces_cards(self):
+        """Правка группы меняет карточки её постов одной версией группы"""
+        group = Group.objects.create(title='Викинги', slug='vikings')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        post = Post.objects.get(pk=self.post.pk)
+        feed_cache.render_cards([post], lambda post: 'Викинги', None,
+                                time.time())
+        group.title = 'Варяги'
+        with CaptureQueriesContext(connection) as context:
+            group.save()
+        for query in context.captured_queries:
+            self.assertNotIn('posts_post', query['sql'])
+        self.assertEqual(
+            feed_cache.render_cards([post], lambda post: 'Варяги', None,
+                                    time.time()),
+            ['Варяги'])
+
+
+class FeedCacheViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        self.post = Post.objects.create(text='текст', author=self.user)
+        self.client = Client()
+
+    def test_feed_page_from_cache(self):
+        """Повторная страница ленты не считает посты заново"""
+        self.client.get(reverse('index'))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('index'))
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_new_post_shows_immediately(self):
+        """Новый пост сразу виден в закэшированной ленте"""
+        self.client.get(reverse('index'))
+        post = Post.objects.create(text='свежий текст', author=self.user)
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0], post)
+        self.assertContains(response, 'свежий текст')
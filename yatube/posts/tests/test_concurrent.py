@@ -0,0 +1,48 @@
+import threading
+
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import routers, slowlog
+from ..concurrent import gather
+
+
+def thread_state():
+    return (threading.get_ident(), routers.current_replica(),
+            slowlog.source())
+
+
+@override_settings(VIEW_LOOKUP_THREADS=2, DATABASE_REPLICAS=['replica'])
+class GatherTest(SimpleTestCase):
+    def test_runs_in_pool(self):
+        """Все функции, кроме первой, выполняются в других потоках"""
+        with routers.replica('replica'), slowlog.issued_by('profile'):
+            first, second, third = gather(thread_state, thread_state,
+                                          thread_state)
+        self.assertEqual(first[0], threading.get_ident())
+        self.assertNotEqual(second[0], threading.get_ident())
+        # реплика и представление запроса переносятся в поток
+        self.assertEqual(second[1:], ('replica', 'profile'))
+        self.assertEqual(third[1:], ('replica', 'profile'))
+
+    def test_exception(self):
+        """Исключение из потока поднимается в представлении"""
+        def missing():
+            raise Http404
+
+        with self.assertRaises(Http404):
+            gather(lambda: 1, missing)
+
+    @override_settings(VIEW_LOOKUP_THREADS=0)
+    def test_disabled(self):
+        """Без потоков функции выполняются по очереди в текущем потоке"""
+        idents = {ident for ident, *_ in gather(thread_state, thread_state)}
+        self.assertEqual(idents, {threading.get_ident()})
+
+
+@override_settings(VIEW_LOOKUP_THREADS=2)
+class GatherTransactionTest(TestCase):
+    def test_sequential_in_transaction(self):
+        """Внутри транзакции другие соединения её не видят"""
+        idents = {ident for ident, *_ in gather(thread_state, thread_state)}
+        self.assertEqual(idents, {threading.get_ident()})
@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Floki')
+        self.group = Group.objects.create(title='Викинги', slug='vikings')
+        self.post = Post.objects.create(text='текст', author=self.author,
+                                        group=self.group)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('index'),
+            'group': reverse('group_posts', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse('post', args=[self.author.username,
+                                          self.post.pk]),
+        }
+        # первая страница с формой выдаёт CSRF-cookie, она входит в ETag
+        self.client.get(self.urls['post'])
+
+    def test_not_modified_without_render(self):
+        """Повторный запрос с тем же ETag получает 304 без рендера"""
+        for name, url in self.urls.items():
+            etag = self.client.get(url)['ETag']
+            with self.subTest(name=name), \
+                    mock.patch('posts.views.render') as render:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                render.assert_not_called()
+
+    def test_new_post_changes_etag(self):
+        """Новый пост меняет ETag лент"""
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items()}
+        Post.objects.create(text='новый', author=self.author,
+                            group=self.group)
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(name=name):
+                response = self.client.get(self.urls[name],
+                                           HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+
+    def test_edit_and_comment_change_etag(self):
+        """Правка поста и новый комментарий меняют ETag"""
+        for change in (
+                lambda: Post.objects.filter(pk=self.post.pk).first().save(),
+                lambda: Comment.objects.create(post=self.post, text='к',
+                                               author=self.reader)):
+            etags = {name: self.client.get(url)['ETag']
+                     for name, url in self.urls.items()}
+            change()
+            for name, url in self.urls.items():
+                with self.subTest(name=name):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[name])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_older_comment_delete_changes_etag(self):
+        """Удаление не последнего комментария меняет ETag"""
+        older = Comment.objects.create(post=self.post, text='к',
+                                       author=self.reader)
+        Comment.objects.create(post=self.post, text='к2', author=self.reader)
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items()}
+        older.delete()
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url,
+                                           HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_group_edit_changes_etag(self):
+        """Переименование группы меняет ETag лент с её постами"""
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items()}
+        self.group.title = 'Варяги'
+        self.group.save()
+        for name in ('index', 'group', 'profile', 'post'):
+            with self.subTest(name=name):
+                response = self.client.get(self.urls[name],
+                                           HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Варяги')
+
+    def test_follow_changes_etag(self):
+        """Подписка меняет ETag профиля и поста для читателя"""
+        etags = {name: self.client.get(self.urls[name])['ETag']
+                 for name in ('profile', 'post')}
+        Follow.objects.create(user=self.reader, author=self.author)
+        for name, etag in etags.items():
+            with self.subTest(name=name):
+                response = self.client.get(self.urls[name],
+                                           HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """ETag читателя не подходит другому пользователю и гостю"""
+        url = self.urls['post']
+        etag = self.client.get(url)['ETag']
+        author = Client()
+        author.force_login(self.author)
+        for client in (author, Client()):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages(self):
+        """Несуществующие страницы отдают 404"""
+        for url in (reverse('group_posts', args=['missing']),
+                    reverse('profile', args=['missing']),
+                    reverse('post', args=[self.author.username, 999])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(text='текст', author=self.author)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter(self):
+        """Счётчик записей меняется при создании и удалении поста"""
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        Post.objects.create(text='ещё текст', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев меняется при создании и удалении"""
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text='комментарий')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_counters_not_below_zero(self):
+        """Удаление при разошедшемся счётчике не уходит ниже нуля"""
+        # bulk_create не шлёт сигналов, как import_posts --no-rebuild
+        Comment.objects.bulk_create(
+            [Comment(post=self.post, author=self.reader, text='к')])
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=0)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обоих пользователей"""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('profile_follow', args=[self.author.username]))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        client.get(reverse('profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_edit_keeps_comment_counter(self):
+        """Редактирование поста не затирает счётчик комментариев"""
+        client = Client()
+        client.force_login(self.author)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='комментарий')
+        client.post(
+            reverse('post_edit', args=[self.author.username, self.post.id]),
+            {'text': 'новый текст'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'новый текст')
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_rebuild_counters(self):
+        """Команда rebuild_counters восстанавливает счётчики"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='комментарий')
+        Post.objects.update(comments_count=7)
+        AuthorStats.objects.all().delete()
+        call_command('rebuild_counters', stdout=open('/dev/null', 'w'))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        stats = self.stats(self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0))
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+    def test_author_card_does_not_count(self):
+        """Карточка автора читает готовые счётчики без COUNT"""
+        with CaptureQueriesContext(connection) as context:
+            response = Client().get(
+                reverse('profile', args=[self.author.username]))
+        self.assertContains(response, 'Записей: 1')
+        counts = [query['sql'] for query in context.captured_queries
+                  if 'COUNT(' in query['sql']]
+        # остаётся только COUNT пагинатора ленты
+        self.assertEqual(len(counts), 1)
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from .. import metrics
+from ..db import check_connection
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10,
+    'mmap_size': 1024 * 1024,
+    'cache_size': -1000,
+}
+
+
+@override_settings(SQLITE={'PRAGMAS': PRAGMAS,
+                           'TRANSACTION_MODE': 'IMMEDIATE'})
+class SqliteSettingsTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+
+    def open(self):
+        wrapper = DatabaseWrapper(
+            dict(connection.settings_dict,
+                 NAME=os.path.join(self.tmp_dir, 'db.sqlite3')),
+            alias='sqlite_settings')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Новое соединение с SQLite получает PRAGMA из настроек"""
+        wrapper = self.open()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 10)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 1024 * 1024)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -1000)
+
+    def test_immediate_transactions(self):
+        """Транзакция сразу берёт блокировку записи"""
+        writer, other = self.open(), self.open()
+        writer._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            other._start_transaction_under_autocommit()
+        writer.connection.rollback()
+
+    @override_settings(SQLITE={'PRAGMAS': {}, 'TRANSACTION_MODE': None})
+    def test_default_mode(self):
+        """Без настроек база остаётся в режиме по умолчанию"""
+        writer, other = self.open(), self.open()
+        self.assertEqual(self.pragma(writer, 'journal_mode'), 'delete')
+        writer._start_transaction_under_autocommit()
+        other._start_transaction_under_autocommit()
+        writer.connection.rollback()
+        other.connection.rollback()
+
+
+class ConnectionHealthTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.wrapper = DatabaseWrapper(
+            dict(connection.settings_dict,
+                 NAME=os.path.join(self.tmp_dir, 'db.sqlite3')),
+            alias='health')
+        self.addCleanup(self.wrapper.close)
+
+    def test_opened_counted(self):
+        """Открытие соединения учитывается в метриках запроса"""
+        with metrics.collect(metrics.RequestMetrics()) as collected:
+            self.wrapper.ensure_connection()
+        self.assertEqual(collected.counters['db_connections_opened'], 1)
+
+    def test_usable_connection_kept(self):
+        """Рабочее соединение остаётся открытым"""
+        self.wrapper.ensure_connection()
+        self.assertTrue(check_connection(self.wrapper))
+        self.assertIsNotNone(self.wrapper.connection)
+
+    def test_broken_connection_closed(self):
+        """Неработающее соединение закрывается до первого запроса"""
+        self.wrapper.ensure_connection()
+        with mock.patch.object(self.wrapper, 'is_usable',
+                               return_value=False), \
+                self.assertLogs('posts.db', 'WARNING'):
+            self.assertFalse(check_connection(self.wrapper))
+        self.assertIsNone(self.wrapper.connection)
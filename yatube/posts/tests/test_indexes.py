@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ragnar')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Название',
+            slug='test-1',
+            description='Текст')
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'тестовый текст{i}',
+                author=cls.user,
+                group=cls.group)
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text='комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_query_plans(self, url):
+        """План каждого SELECT, выполненного при открытии страницы"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return ' | '.join(plans)
+
+    def test_views_use_indexes(self):
+        """Ленты, пост и подписки читаются по составным индексам"""
+        feed_url = reverse('index')
+        group_url = reverse('group_posts', args=[self.group.slug])
+        profile_url = reverse('profile', args=[self.user.username])
+        post_url = reverse('post', args=[self.user.username, self.post.id])
+        follow_url = reverse('follow_index')
+        follow_lookup = '(user_id=? AND author_id=?)'
+        cases = (
+            (feed_url, 'post_pub_date_idx'),
+            (group_url, 'post_group_pub_date_idx (group_id=?)'),
+            (profile_url, 'post_author_pub_date_idx (author_id=?)'),
+            (profile_url, follow_lookup),
+            (post_url, 'comment_post_created_idx (post_id=?)'),
+            (post_url, follow_lookup),
+            (follow_url, 'timeline_user_pub_date_idx (user_id=?)'),
+        )
+        for url, index in cases:
+            with self.subTest(url=url, index=index):
+                self.assertIn(index, self.get_query_plans(url))
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора невозможна"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.user)
+
+    def test_unfollow_without_follow(self):
+        """Отписка от автора без подписки не падает"""
+        response = self.client.get(
+            reverse('profile_unfollow', args=[self.reader.username]))
+        self.assertRedirects(
+            response, reverse('profile', args=[self.reader.username]))
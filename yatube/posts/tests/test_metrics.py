@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from ..metrics import REGISTRY
+from ..models import Post
+
+User = get_user_model()
+
+
+# замеряются кэши лент и карточек, поэтому кэш страниц гостей выключен
+@override_settings(METRICS_SAMPLE_RATE=1, PAGE_CACHE_TIMEOUT=0,
+                   METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        Post.objects.create(text='текст', author=self.user)
+        # фоновые задачи поста тоже попадают в REGISTRY
+        REGISTRY.clear()
+        self.client = Client()
+
+    def timing(self, response):
+        return dict(item.split(';', 1) for item
+                    in response['Server-Timing'].split(', '))
+
+    def test_server_timing(self):
+        """Замеренный запрос получает заголовок Server-Timing"""
+        timing = self.timing(self.client.get(reverse('index')))
+        self.assertEqual(set(timing), {'db', 'tpl', 'cache', 'total'})
+        self.assertIn('queries', timing['db'])
+        self.assertIn('3 misses', timing['cache'])
+        timing = self.timing(self.client.get(reverse('index')))
+        self.assertIn('3 hits 0 misses', timing['cache'])
+        # из кэша берутся только id постов, сами посты читаются одним
+        # запросом, ещё один — валидаторы ETag
+        self.assertIn('desc="2 queries"', timing['db'])
+
+    def test_registry(self):
+        """Счётчики копятся по представлениям и отдаются в /metrics/"""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('yatube_requests_total{view="index"} 2', text)
+        self.assertIn('# TYPE yatube_db_queries_total counter', text)
+        self.assertIn('yatube_cache_hits_total{view="index"} 3', text)
+
+    def test_connections(self):
+        """Соединение, открытое прошлым запросом, переиспользуется"""
+        self.client.get(reverse('index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('yatube_db_connections_reused_total{view="index"} 1',
+                      text)
+        self.assertIn('yatube_db_connections_opened_total{view="index"} 0',
+                      text)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Запросы вне выборки не замеряются"""
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(REGISTRY.render(), '\n')
+
+    def test_metrics_hidden(self):
+        """Страница метрик скрыта от посторонних адресов"""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_staff_only(self):
+        """Без METRICS_ALLOWED_IPS метрики видит только персонал"""
+        for url in (reverse('metrics'), reverse('slow_queries')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        staff = Client()
+        staff.force_login(User.objects.create_user(username='admin',
+                                                   is_staff=True))
+        for url in (reverse('metrics'), reverse('slow_queries')):
+            with self.subTest(url=url):
+                self.assertEqual(staff.get(url).status_code, 200)
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import Client, TestCase
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class GuestPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Floki')
+        self.group = Group.objects.create(title='Викинги', slug='vikings')
+        self.other_group = Group.objects.create(title='Саксы', slug='saxons')
+        self.post = Post.objects.create(text='текст', author=self.author,
+                                        group=self.group)
+        self.guest = Client()
+        self.urls = {
+            'index': reverse('index'),
+            'group': reverse('group_posts', args=[self.group.slug]),
+            'other_group': reverse('group_posts',
+                                   args=[self.other_group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse('post', args=[self.author.username,
+                                          self.post.pk]),
+        }
+
+    def warm_up(self):
+        for url in self.urls.values():
+            self.guest.get(url)
+
+    def cached(self):
+        """Имена страниц, которые гость получает из кэша."""
+        names = set()
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                hits = Client()
+                response = hits.get(url)
+                self.assertEqual(response.status_code, 200)
+                if response.context is None:
+                    names.add(name)
+        return names
+
+    def test_guest_pages_cached(self):
+        """Повторная страница гостя отдаётся без запросов к базе"""
+        self.warm_up()
+        for name, url in self.urls.items():
+            with self.subTest(name=name), self.assertNumQueries(0):
+                response = self.guest.get(url)
+            self.assertIn('s-maxage=', response['Cache-Control'])
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn('Cookie', response['Vary'])
+
+    def test_not_modified_from_cache(self):
+        """ETag закэшированной страницы даёт 304"""
+        etag = self.guest.get(self.urls['index'])['ETag']
+        response = self.guest.get(self.urls['index'],
+                                  HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_pages_private(self):
+        """Страницы пользователя не кэшируются и помечены private"""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(self.urls['index'])
+        response = client.get(self.urls['index'])
+        self.assertIsNotNone(response.context)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_new_post_purges_its_pages(self):
+        """Новый пост сбрасывает ленту, свою группу и страницы автора"""
+        self.warm_up()
+        Post.objects.create(text='новый', author=self.author,
+                            group=self.group)
+        self.assertEqual(self.cached(), {'other_group'})
+
+    def test_moved_post_purges_both_groups(self):
+        """Перенос поста в другую группу сбрасывает и прежнюю группу"""
+        self.warm_up()
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.cached(), set())
+        self.assertNotContains(self.guest.get(self.urls['group']), 'текст')
+
+    def test_group_delete_purges_its_posts(self):
+        """Удаление группы убирает её название с карточек постов"""
+        self.warm_up()
+        client = Client()
+        client.force_login(self.reader)
+        client.get(self.urls['index'])
+        group_url = self.urls.pop('group')
+        self.group.delete()
+        self.assertEqual(self.cached(), {'other_group'})
+        self.assertNotContains(self.guest.get(self.urls['index']), 'Викинги')
+        self.assertNotContains(client.get(self.urls['index']), 'Викинги')
+        self.assertEqual(self.guest.get(group_url).status_code, 404)
+
+    def test_group_slug_change_purges_old_address(self):
+        """Смена адреса группы сбрасывает страницу по прежнему адресу"""
+        self.warm_up()
+        self.group.slug = 'varangians'
+        self.group.save()
+        self.assertEqual(self.guest.get(self.urls['group']).status_code,
+                         404)
+
+    def test_comment_purges_post_pages(self):
+        """Комментарий сбрасывает страницы, где видна карточка поста"""
+        self.warm_up()
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        self.assertEqual(self.cached(), {'other_group'})
+
+    def test_follow_purges_author_pages(self):
+        """Подписка сбрасывает профиль автора и страницы его постов"""
+        self.warm_up()
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.cached(), {'index', 'group', 'other_group'})
+
+    def test_guest_sees_new_comment(self):
+        """После комментария гость видит его на странице поста"""
+        self.warm_up()
+        client = Client()
+        client.force_login(self.reader)
+        client.post(reverse('add_comment', args=[self.author.username,
+                                                 self.post.pk]),
+                    {'text': 'Свежий комментарий'})
+        self.assertContains(self.guest.get(self.urls['post']),
+                            'Свежий комментарий')
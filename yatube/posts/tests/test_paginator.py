@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import reverse
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Post
+from ..paginator import CursorPaginator, FeedPaginator
+
+User = get_user_model()
+
+
+class FeedPaginatorTest(SimpleTestCase):
+    def test_elided_page_range(self):
+        """Номера страниц сокращаются до окна вокруг текущей"""
+        paginator = FeedPaginator(range(500), 10)
+        ellipsis = FeedPaginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, ellipsis, 50],
+            5: [1, 2, 3, 4, 5, 6, 7, ellipsis, 50],
+            25: [1, ellipsis, 23, 24, 25, 26, 27, ellipsis, 50],
+            50: [1, ellipsis, 48, 49, 50],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected)
+
+    def test_short_range_is_not_elided(self):
+        """Короткий список страниц выводится целиком"""
+        paginator = FeedPaginator(range(60), 10)
+        self.assertEqual(list(paginator.get_elided_page_range(3)),
+                         list(paginator.page_range))
+
+    def test_template_size_does_not_depend_on_page_count(self):
+        """Шаблон пагинатора выводит ограниченное число ссылок"""
+        page = FeedPaginator(range(500000), 10).get_page(25000)
+        html = render_to_string('includes/paginator.html', {'page': page})
+        self.assertEqual(html.count('<li'), 11)
+        self.assertIn('?page=50000', html)
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ragnar')
+        for i in range(25):
+            Post.objects.create(text=f'тестовый текст{i}', author=cls.user)
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.paginator = CursorPaginator(Post.objects.feed(), 10)
+
+    def test_forward_walk_returns_every_post_once(self):
+        """Проход вперёд по курсорам выдаёт все посты по порядку"""
+        seen = []
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_walk_returns_previous_pages(self):
+        """Курсор назад возвращает ту же страницу, что была до этого"""
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(len(third), 5)
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual([p.pk for p in back], [p.pk for p in second])
+        back = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual([p.pk for p in back], [p.pk for p in first])
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_gives_first_page(self):
+        """Некорректный курсор открывает первую страницу"""
+        for cursor in ('мусор', 'e30', '!!!', 'WzEsMiwzXQ'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual([p.pk for p in page], self.expected[:10])
+
+    def test_no_count_and_offset(self):
+        """Глубокая страница не считает строки и не использует OFFSET"""
+        page = self.paginator.get_page()
+        page = self.paginator.get_page(page.next_cursor)
+        with CaptureQueriesContext(connection) as context:
+            self.paginator.get_page(page.next_cursor)
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(*)', sql)
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_views_use_cursor_links(self):
+        """В курсорном режиме пагинатор выводит ссылки ?cursor="""
+        client = Client()
+        response = client.get(reverse('index'))
+        page = response.context['page']
+        self.assertTrue(page.is_cursor)
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+        response = client.get(
+            reverse('profile', args=[self.user.username]),
+            {'cursor': page.next_cursor})
+        self.assertEqual([p.pk for p in response.context['page']],
+                         self.expected[10:20])
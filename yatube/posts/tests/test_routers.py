@@ -0,0 +1,130 @@
+import copy
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from ..models import Post
+from ..routers import PIN_COOKIE, replica
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    """Основная база — тестовая default, реплика — отдельный файл SQLite."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.tmp_dir, 'replica.sqlite3'),
+        }
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_router(self):
+        """Внутри replica() чтение идёт в реплику, запись — в default"""
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with replica():
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_reads_from_replica(self):
+        """Страницы для чтения берут посты из реплики"""
+        Post.objects.create(text='Только в основной базе', author=self.user)
+        # в реплику данные приходят репликацией, без сигналов
+        User.objects.using('replica').bulk_create([User(username='Floki')])
+        Post.objects.using('replica').bulk_create(
+            [Post(text='Уже в реплике',
+                  author=User.objects.using('replica').get())])
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'Уже в реплике')
+        self.assertNotContains(response, 'Только в основной базе')
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_replica_queries_measured(self):
+        """Запросы к реплике входят в метрики запроса"""
+        timing = Client().get(reverse('index'))['Server-Timing']
+        self.assertNotIn('desc="0 queries"', timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    def replicate(self, *objects):
+        """Копирует строки в реплику как есть, без сигналов."""
+        for obj in objects:
+            type(obj).objects.using('replica').bulk_create([copy.copy(obj)])
+
+    def pinned_client(self, user):
+        client = Client()
+        client.force_login(user)
+        client.cookies[PIN_COOKIE] = '1'
+        return client
+
+    def test_stale_replica_card_not_cached(self):
+        """Карточку из отставшей реплики кэш не сохраняет"""
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        self.replicate(self.user, post)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertContains(Client().get(reverse('index')), 'Старый текст')
+        reader = User.objects.create_user(username='Floki')
+        response = self.pinned_client(reader).get(reverse('index'))
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Старый текст')
+
+    def test_stale_replica_feed_not_cached(self):
+        """Ленту и страницу из отставшей реплики кэш не сохраняет"""
+        self.replicate(self.user)
+        Post.objects.create(text='Свежий пост', author=self.user)
+        self.assertNotContains(Client().get(reverse('index')),
+                               'Свежий пост')
+        author = self.pinned_client(self.user)
+        self.assertContains(author.get(reverse('index')), 'Свежий пост')
+        guest = Client()
+        guest.cookies[PIN_COOKIE] = '1'
+        self.assertContains(guest.get(reverse('index')), 'Свежий пост')
+
+    def test_write_pins_author(self):
+        """После записи автор читает из основной базы и видит свой пост"""
+        response = self.client.post(reverse('new_post'),
+                                    {'text': 'Свежий пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertContains(self.client.get(reverse('index')), 'Свежий пост')
+        self.assertNotContains(Client().get(reverse('index')), 'Свежий пост')
+
+    def test_reads_do_not_pin(self):
+        """Чтение не закрепляет клиента за основной базой"""
+        response = Client().get(reverse('index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё идёт в основную базу, cookie не ставится"""
+        Post.objects.create(text='Только в основной базе', author=self.user)
+        response = self.client.post(reverse('new_post'), {'text': 'Пост'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertContains(Client().get(reverse('index')),
+                            'Только в основной базе')
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from .. import search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class StemTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к одной основе"""
+        cases = (
+            ('книга', 'книги', 'книгой', 'книгами'),
+            ('красивый', 'красивая', 'красивейшая'),
+            ('ёлка', 'елки', 'Ёлкой'),
+        )
+        for words in cases:
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(w) for w in words}), 1)
+
+    def test_other_words_lowercased(self):
+        """Слова не на русском только приводятся к нижнему регистру"""
+        self.assertEqual(search.tokenize('Django 2.2'), ['django', '2', '2'])
+
+    def test_query_syntax_is_quoted(self):
+        """Синтаксис FTS5 в запросе пользователя не работает"""
+        self.assertEqual(search.match_expression('книги OR "NEAR(*'),
+                         '"книг" "or" "near"')
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        self.book = Post.objects.create(
+            text='Прочитал новую книгу о викингах', author=self.user)
+        self.other = Post.objects.create(text='Сегодня был дождь',
+                                         author=self.user)
+        self.client = Client()
+
+    def found(self, query):
+        results = search.SearchResults(query)
+        return results[0:results.count()]
+
+    def test_finds_word_forms(self):
+        """Поиск находит пост по другой форме слова"""
+        self.assertEqual(self.found('книги'), [self.book])
+        self.assertEqual(self.found('викинг книга'), [self.book])
+        self.assertEqual(self.found('викинг дождь'), [])
+        self.assertEqual(self.found(''), [])
+
+    def test_index_follows_edits(self):
+        """Индекс меняется при редактировании и удалении поста"""
+        self.book.text = 'Посмотрел фильм'
+        self.book.save()
+        self.assertEqual(self.found('книга'), [])
+        self.assertEqual(self.found('фильмы'), [self.book])
+        self.book.delete()
+        self.assertEqual(self.found('фильм'), [])
+
+    def test_finds_comments(self):
+        """Поиск находит пост по тексту комментария"""
+        comment = Comment.objects.create(post=self.other, author=self.user,
+                                         text='Зонтики не помогли')
+        self.assertEqual(self.found('зонтик'), [self.other])
+        comment.delete()
+        self.assertEqual(self.found('зонтик'), [])
+
+    def test_post_text_ranks_higher(self):
+        """Совпадение в тексте поста важнее совпадения в комментарии"""
+        Comment.objects.create(post=self.book, author=self.user,
+                               text='Какой дождь')
+        self.assertEqual(self.found('дождя'), [self.other, self.book])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_results_are_capped(self):
+        """Ранжируются только SEARCH_MAX_RESULTS новых совпадений"""
+        posts = [Post.objects.create(text='дождь', author=self.user)
+                 for _ in range(2)]
+        self.assertEqual(sorted(p.pk for p in self.found('дождь')),
+                         [post.pk for post in posts])
+        response = self.client.get(reverse('search'), {'q': 'дождь'})
+        self.assertContains(response, 'Найдено записей: 2+')
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_search_view(self):
+        """Страница поиска показывает найденное и листается с запросом"""
+        Post.objects.create(text='Книжный магазин и книга', author=self.user)
+        response = self.client.get(reverse('search'), {'q': 'книга'})
+        self.assertEqual(response.context['page'].paginator.count, 2)
+        self.assertContains(response, 'Найдено записей: 2<')
+        self.assertContains(response, '?q=%D0%BA%D0%BD%D0%B8%D0%B3%D0%B0'
+                                      '&amp;page=2')
+        response = self.client.get(reverse('search'),
+                                   {'q': 'книга', 'page': 2})
+        self.assertEqual(list(response.context['page']), [self.book])
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index собирает индекс заново"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.found('книга'), [self.book])
@@ -0,0 +1,103 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from ..metrics import REGISTRY
+from ..models import Post
+from ..slowlog import SLOW_QUERIES, fingerprint, normalize
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0,
+                   METRICS_ALLOWED_IPS=['127.0.0.1'])
+class SlowQueryLogTest(TestCase):
+    # при пороге 0 в журнал попадает каждый запрос, в вывод тестов — нет
+    handler = logging.NullHandler()
+
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger('posts.slowlog').addHandler(cls.handler)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        logging.getLogger('posts.slowlog').removeHandler(cls.handler)
+
+    def setUp(self):
+        cache.clear()
+        REGISTRY.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        Post.objects.create(text='текст', author=self.user)
+        self.client = Client()
+        SLOW_QUERIES.clear()
+
+    def test_fingerprint(self):
+        """Запросы, отличающиеся значениями, получают один отпечаток"""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE id IN (1, 2, 3) AND a = 'x'"),
+            "SELECT * FROM t WHERE id IN (...) AND a = ?")
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+                         fingerprint('SELECT  *  FROM t\nWHERE id IN (5, 7)'))
+
+    def test_slow_queries_logged(self):
+        """Запросы дольше порога пишутся в лог с представлением и планом"""
+        with self.assertLogs('posts.slowlog', 'WARNING') as logs:
+            self.client.get(reverse('index'))
+        self.assertIn('"view": "index"', logs.output[0])
+        top = SLOW_QUERIES.top()
+        self.assertTrue(top)
+        self.assertTrue(all(query['views'] == {'index': query['count']}
+                            for query in top))
+        posts = [query for query in top if 'FROM "posts_post"' in
+                 query['sql'] and query['sql'].startswith('SELECT')]
+        self.assertTrue(posts[0]['plan'])
+        # EXPLAIN выполняется без журнала
+        self.assertFalse(any(query['sql'].startswith('EXPLAIN')
+                             for query in top))
+
+    def test_params_not_logged(self):
+        """Значения параметров запросов не попадают в журнал"""
+        with self.assertLogs('posts.slowlog', 'WARNING') as logs:
+            User.objects.create_user(username='Floki', password='секрет')
+            self.client.force_login(self.user)
+        output = '\n'.join(logs.output)
+        self.assertIn('"sql": "INSERT INTO \\"auth_user\\"', output)
+        self.assertNotIn('pbkdf2', output)
+        self.assertNotIn(self.client.session.session_key, output)
+
+    def test_aggregated(self):
+        """Повторы запроса копятся в одном отпечатке"""
+        self.client.get(reverse('profile', args=['Ragnar']))
+        cache.clear()
+        self.client.get(reverse('profile', args=['Ragnar']))
+        counts = [query['count'] for query in SLOW_QUERIES.top()]
+        self.assertIn(2, counts)
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_with_metrics(self):
+        """Журнал работает и в замеренных запросах"""
+        self.client.get(reverse('index'))
+        self.assertTrue(SLOW_QUERIES.top())
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('yatube_slow_queries_total{view="index"}', text)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        """Без порога журнал не ведётся"""
+        self.client.get(reverse('index'))
+        self.assertEqual(SLOW_QUERIES.top(), [])
+
+    def test_report(self):
+        """Страница /metrics/slow/ показывает самые дорогие запросы"""
+        self.client.get(reverse('index'))
+        text = self.client.get(reverse('slow_queries')).content.decode()
+        self.assertIn('представления: index', text)
+        self.assertIn('1. ', text)
+        response = self.client.get(reverse('slow_queries'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import transaction
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from .. import tasks
+from ..models import Follow, Post, Task, TimelineEntry
+
+User = get_user_model()
+CALLS = []
+
+
+@tasks.task
+def remember(value):
+    CALLS.append(value)
+
+
+@tasks.task
+def broken():
+    raise ValueError('сломано')
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(TASKS={**settings.TASKS, 'BACKEND': 'database'})
+class DatabaseTasksTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        CALLS.clear()
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Floki')
+        Follow.objects.create(user=self.reader, author=self.author)
+        # задача backfill подписки
+        tasks.work(burst=True)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_new_post_returns_before_fan_out(self):
+        """Пост раскладывается по лентам воркером, а не в запросе"""
+        response = self.client.post(reverse('new_post'), {'text': 'Пост'})
+        self.assertRedirects(response, reverse('index'))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(TimelineEntry.objects.get().user, self.reader)
+        self.assertFalse(Task.objects.exists())
+
+    def test_follow_returns_before_backfill(self):
+        """Лента дополняется и чистится воркером, а не в запросе"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        tasks.work(burst=True)
+        follower = User.objects.create_user(username='Bjorn')
+        Follow.objects.create(user=follower, author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=follower).exists())
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(TimelineEntry.objects.get(user=follower).post, post)
+        Follow.objects.filter(user=follower).delete()
+        self.assertTrue(TimelineEntry.objects.filter(user=follower).exists())
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertFalse(TimelineEntry.objects.filter(user=follower).exists())
+
+    def test_rollback_drops_task(self):
+        """Задача ставится в той же транзакции, что и запись"""
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            tasks.enqueue(remember, 1)
+            1 / 0
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача откладывается, после MAX_ATTEMPTS — failed"""
+        tasks.enqueue(broken)
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            self.assertEqual(tasks.work(burst=True), 0)
+        failed = Task.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertFalse(failed.failed)
+        self.assertIn('сломано', failed.last_error)
+        self.assertGreater(failed.run_at, timezone.now()
+                           + timedelta(seconds=settings.TASKS['RETRY_DELAY']
+                                       - 1))
+        Task.objects.update(run_at=timezone.now(),
+                            attempts=settings.TASKS['MAX_ATTEMPTS'] - 1)
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            tasks.work(burst=True)
+        self.assertTrue(Task.objects.get().failed)
+        self.assertIsNone(tasks.claim())
+
+    def test_claimed_task_is_locked(self):
+        """Задачу, которую уже выполняет воркер, другой не забирает"""
+        tasks.enqueue(remember, 1)
+        claimed = tasks.claim()
+        self.assertEqual(claimed.arguments, [1])
+        self.assertIsNone(tasks.claim())
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.claim().attempts, 2)
+
+    def test_only_tasks_are_run(self):
+        """Воркер выполняет только функции с декоратором task"""
+        with self.assertRaises(ImproperlyConfigured):
+            tasks.resolve(f'{__name__}.not_a_task')
+        tasks.resolve(f'{__name__}.remember')
+
+    def test_run_workers_command(self):
+        """run_workers --burst выполняет очередь и выходит"""
+        tasks.enqueue(remember, 1)
+        tasks.enqueue(remember, 2)
+        call_command('run_workers', '--burst', '--processes', '1',
+                     stdout=open('/dev/null', 'w'))
+        self.assertEqual(CALLS, [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+
+class ThreadTasksTest(TestCase):
+    def test_retry_in_process(self):
+        """Бэкенд thread повторяет задачу сам, без очереди в базе"""
+        with mock.patch.object(tasks.threading, 'Timer') as timer, \
+                self.assertLogs('posts.tasks', 'ERROR'):
+            tasks.run_with_retries(broken.task_name, [])
+        delay, retry, args = timer.call_args[0]
+        self.assertEqual(delay, settings.TASKS['RETRY_DELAY'])
+        self.assertEqual((retry, args), (tasks._submit,
+                                         (broken.task_name, [], 2)))
+        timer.return_value.start.assert_called_once_with()
+        self.assertFalse(Task.objects.exists())
+
+    def test_last_attempt_is_kept(self):
+        """После MAX_ATTEMPTS задача остаётся в таблице с failed=True"""
+        attempts = settings.TASKS['MAX_ATTEMPTS']
+        with mock.patch.object(tasks.threading, 'Timer') as timer, \
+                self.assertLogs('posts.tasks', 'ERROR'):
+            tasks.run_with_retries(broken.task_name, [], attempts)
+        timer.assert_not_called()
+        failed = Task.objects.get()
+        self.assertEqual((failed.attempts, failed.failed), (attempts, True))
+        self.assertIn('сломано', failed.last_error)
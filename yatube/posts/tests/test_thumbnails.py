@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='picture.png', size=(1200, 900), color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+def make_rotated_photo():
+    """
+    Снимок 1200x600 с EXIF Orientation=6: повёрнутый по EXIF, он
+    стоит вертикально, левая красная половина оказывается сверху.
+    """
+    image = Image.new('RGB', (1200, 600), 'blue')
+    image.paste('red', (0, 0, 600, 600))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # pk постов повторяются между тестами, как и каталоги вариантов
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='Ragnar')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(text='текст', author=self.user,
+                                        image=make_image())
+
+    def test_generate(self):
+        """Варианты строятся с обрезкой по пропорциям POST_THUMBNAIL_SIZE"""
+        url = thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_url, url)
+        self.assertEqual(self.post.thumbnail_srcset.count('w,'), 2)
+        self.assertIn('.webp 1000w', self.post.thumbnail_webp_srcset)
+        for size in ((400, 200), (700, 350), (1000, 500)):
+            for extension, image_format in (('jpg', 'JPEG'),
+                                            ('webp', 'WEBP')):
+                name = thumbnails.thumbnail_name(
+                    self.post.pk, self.post.image.name, size, extension)
+                with self.subTest(name=name), \
+                        default_storage.open(name) as thumbnail:
+                    image = Image.open(thumbnail)
+                    self.assertEqual(image.size, size)
+                    self.assertEqual(image.format, image_format)
+
+    def test_same_stem_does_not_collide(self):
+        """Картинки a.png и a.jpg разных постов не делят миниатюры"""
+        red = Post.objects.create(text='красный', author=self.user,
+                                  image=make_image('a.png'))
+        blue = Post.objects.create(text='синий', author=self.user,
+                                   image=make_image('a.jpg', color='blue'))
+        for post in (red, blue):
+            thumbnails.generate(post.pk)
+            post.refresh_from_db()
+        self.assertNotEqual(red.thumbnail_url, blue.thumbnail_url)
+        for post, color in ((red, (255, 0, 0)), (blue, (0, 0, 255))):
+            name = post.thumbnail_url[len(settings.MEDIA_URL):]
+            with self.subTest(color=color), \
+                    default_storage.open(name) as thumbnail:
+                pixel = Image.open(thumbnail).convert('RGB').getpixel((5, 5))
+                for channel, expected in zip(pixel, color):
+                    self.assertAlmostEqual(channel, expected, delta=10)
+
+    def variant_files(self, post):
+        directory = os.path.join(settings.MEDIA_ROOT, 'thumbnails',
+                                 str(post.pk))
+        return sorted(os.path.relpath(os.path.join(root, name), directory)
+                      for root, _, names in os.walk(directory)
+                      for name in names)
+
+    def test_regenerate_replaces_files(self):
+        """Повторное построение заменяет варианты, а не копит их"""
+        thumbnails.generate(self.post.pk)
+        files = self.variant_files(self.post)
+        self.assertEqual(len(files), 6)
+        thumbnails.generate(self.post.pk)
+        thumbnails.generate(self.post.pk)
+        self.assertEqual(self.variant_files(self.post), files)
+
+    def test_replaced_and_deleted_image_files(self):
+        """Варианты прежней картинки и удалённого поста удаляются"""
+        thumbnails.generate(self.post.pk)
+        old = self.variant_files(self.post)
+        self.client.post(
+            reverse('post_edit', args=[self.user.username, self.post.id]),
+            {'text': 'правка', 'image': make_image('other.png')})
+        new = self.variant_files(self.post)
+        self.assertEqual(len(new), 6)
+        self.assertFalse(set(old) & set(new))
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.variant_files(self.post), [])
+
+    def test_exif_orientation(self):
+        """Миниатюра снимка повёрнута по EXIF"""
+        post = Post.objects.create(text='снимок', author=self.user,
+                                   image=make_rotated_photo())
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        name = post.thumbnail_url[len(settings.MEDIA_URL):]
+        with default_storage.open(name) as thumbnail:
+            image = Image.open(thumbnail).convert('RGB')
+            top = image.getpixel((5, 5))
+            bottom = image.getpixel((5, image.height - 5))
+        self.assertGreater(top[0], top[2])
+        self.assertGreater(bottom[2], bottom[0])
+
+    def test_small_image_is_not_upscaled_to_every_width(self):
+        """Для маленькой картинки строится только меньший вариант"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=make_image('small.png', (300, 200)))
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_srcset, f'{post.thumbnail_url} 400w')
+
+    def test_feed_does_not_open_images(self):
+        """Лента выводит готовые миниатюры без обращения к Pillow"""
+        thumbnails.generate(self.post.pk)
+        cache.clear()
+        with mock.patch('PIL.Image.open', side_effect=AssertionError):
+            response = self.client.get(reverse('index'))
+        self.post.refresh_from_db()
+        self.assertContains(response, self.post.thumbnail_url)
+        self.assertContains(response, 'srcset="' + self.post.thumbnail_srcset)
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_views_schedule_thumbnails(self):
+        """Создание и замена картинки ставят миниатюру в очередь"""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.client.post(reverse('new_post'),
+                             {'text': 'новый', 'image': make_image()})
+            self.client.post(
+                reverse('post_edit', args=[self.user.username,
+                                           self.post.id]),
+                {'text': 'правка', 'image': make_image('other.png')})
+            self.client.post(
+                reverse('post_edit', args=[self.user.username,
+                                           self.post.id]),
+                {'text': 'правка без картинки'})
+        self.assertEqual(schedule.call_count, 2)
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails строит недостающие миниатюры"""
+        call_command('generate_thumbnails', stdout=open('/dev/null', 'w'))
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnail_url)
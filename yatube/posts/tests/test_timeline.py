@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import Client, TestCase, override_settings
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Reader')
+        self.old_post = Post.objects.create(text='старый текст',
+                                            author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def timeline_posts(self, user):
+        return list(TimelineEntry.objects.filter(user=user)
+                    .values_list('post_id', flat=True))
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты"""
+        self.assertEqual(self.timeline_posts(self.reader),
+                         [self.old_post.pk])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков"""
+        post = Post.objects.create(text='текст', author=self.author)
+        self.assertEqual(self.timeline_posts(self.reader),
+                         [post.pk, self.old_post.pk])
+        self.assertEqual(self.timeline_posts(self.author), [])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.timeline_posts(self.reader), [])
+
+    def test_late_tasks_follow_current_state(self):
+        """Задачи, выполненные не по порядку, не портят ленту"""
+        timeline.unfollow(self.reader.pk, self.author.pk)
+        self.assertEqual(self.timeline_posts(self.reader),
+                         [self.old_post.pk])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        timeline.backfill(self.reader.pk, self.author.pk)
+        self.assertEqual(self.timeline_posts(self.reader), [])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3)
+    def test_timeline_is_capped(self):
+        """В ленте хранится не больше TIMELINE_MAX_LENGTH постов"""
+        posts = [Post.objects.create(text=f'текст{i}', author=self.author)
+                 for i in range(5)]
+        expected = [post.pk for post in reversed(posts[-3:])]
+        self.assertEqual(self.timeline_posts(self.reader), expected)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_pulled_on_read(self):
+        """Посты популярных авторов подмешиваются при чтении"""
+        post = Post.objects.create(text='текст', author=self.author)
+        self.assertNotIn(post.pk, self.timeline_posts(self.reader))
+        self.assertIn(post, timeline.posts_for(self.reader))
+        self.assertEqual(timeline.posts_for(self.reader).count(), 2)
+
+    def test_follow_index_reads_timeline(self):
+        """Страница подписок показывает посты из ленты"""
+        post = Post.objects.create(text='текст', author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['page'].object_list),
+                         [post, self.old_post])
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True, POSTS_PER_PAGE=2)
+    def test_follow_index_cursor_pages(self):
+        """Лента подписок листается по курсору"""
+        posts = [Post.objects.create(text=f'текст{i}', author=self.author)
+                 for i in range(2)]
+        client = Client()
+        client.force_login(self.reader)
+        page = client.get(reverse('follow_index')).context['page']
+        self.assertEqual(list(page), posts[::-1])
+        page = client.get(reverse('follow_index'),
+                          {'cursor': page.next_cursor}).context['page']
+        self.assertEqual(list(page), [self.old_post])
+        self.assertFalse(page.has_next())
+
+    def test_rebuild_timelines(self):
+        """Команда rebuild_timelines собирает ленту заново"""
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.timeline_posts(self.reader),
+                         [self.old_post.pk])
@@ -0,0 +1,102 @@
+import io
+import json
+import tempfile
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import search, timeline, transfer
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+PUB_DATE = datetime(2019, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ragnar')
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(title='Викинги', slug='vikings')
+        self.post = Post.objects.create(text='Набег на Англию',
+                                        author=self.author, group=self.group)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=PUB_DATE)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Удачи!')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tmp_dir(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def export(self, file_format='jsonl'):
+        stream = io.StringIO()
+        write = getattr(transfer, f'write_{file_format}')
+        write(transfer.export_records(), stream)
+        return stream.getvalue()
+
+    def reimport(self, data, path):
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        with open(path, 'w') as stream:
+            stream.write(data)
+        call_command('import_posts', path, batch_size=2,
+                     stdout=io.StringIO())
+
+    def assert_restored(self):
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.pk, post.text, post.pub_date, post.author.username,
+             post.group.slug, post.comments_count),
+            (self.post.pk, 'Набег на Англию', PUB_DATE, 'Ragnar',
+             'vikings', 1))
+        self.assertEqual(Comment.objects.get().author.username, 'Reader')
+        reader = User.objects.get(username='Reader')
+        self.assertEqual(AuthorStats.objects.get(user=post.author)
+                         .followers_count, 1)
+        self.assertEqual(list(timeline.posts_for(reader)), [post])
+        self.assertEqual(search.SearchResults('англия')[0:1], [post])
+
+    def test_export_jsonl(self):
+        """Экспорт пишет по одной записи на строку"""
+        records = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([record['model'] for record in records],
+                         ['group', 'post', 'comment', 'follow'])
+        self.assertEqual(records[1]['author'], 'Ragnar')
+        self.assertEqual(records[1]['pub_date'], '2019-05-01T12:00:00+00:00')
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка JSONL загружается обратно с датами и связями"""
+        self.reimport(self.export(), f'{self.tmp_dir()}/data.jsonl')
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        """Выгрузка CSV загружается обратно с датами и связями"""
+        self.reimport(self.export('csv'), f'{self.tmp_dir()}/data.csv')
+        self.assert_restored()
+
+    def test_batches(self):
+        """Записи сохраняются пачками, пользователи создаются по ходу"""
+        records = [{'model': 'post', 'text': f'текст {i}',
+                    'author': f'user{i % 3}'} for i in range(7)]
+        # два словаря, пользователи и их id, три пачки постов
+        with self.assertNumQueries(7):
+            counts = transfer.Importer(batch_size=3).run(records)
+        self.assertEqual(counts['post'], 7)
+        self.assertEqual(User.objects.filter(
+            username__startswith='user').count(), 3)
+
+    def test_bad_data(self):
+        """Ошибка в данных останавливает импорт без частичной записи"""
+        path = f'{self.tmp_dir()}/bad.jsonl'
+        with open(path, 'w') as stream:
+            stream.write(json.dumps({'model': 'post', 'text': 'текст',
+                                     'author': 'Ragnar'}) + '\n')
+            stream.write(json.dumps({'model': 'poll'}) + '\n')
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=io.StringIO())
+        self.assertEqual(Post.objects.count(), 1)
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import tracemalloc
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.shortcuts import reverse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(size=(100, 100), image_format='PNG', noise=False):
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size, 'red')
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def upload(content, name='picture.png'):
+    return SimpleUploadedFile(name, content, content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ragnar')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post_image(self, content):
+        return self.client.post(reverse('new_post'),
+                                {'text': 'текст', 'image': upload(content)})
+
+    def test_valid_image_is_saved(self):
+        """Обычная картинка проходит проверку и сохраняется"""
+        self.post_image(image_bytes())
+        self.assertTrue(Post.objects.get().image)
+
+    @override_settings(POST_IMAGE_MAX_BYTES=50 * 1024)
+    def test_large_file_rejected(self):
+        """Файл больше POST_IMAGE_MAX_BYTES отклоняется"""
+        response = self.post_image(image_bytes((500, 500), noise=True))
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 50,0\xa0КБ')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_dimensions_rejected(self):
+        """Картинка больше POST_IMAGE_MAX_PIXELS отклоняется по заголовку"""
+        response = self.post_image(image_bytes((200, 101)))
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое изображение: 200x101')
+
+    @override_settings(POST_IMAGE_FORMATS=('JPEG',))
+    def test_format_rejected(self):
+        """Картинка неразрешённого формата отклоняется"""
+        response = self.post_image(image_bytes())
+        self.assertFormError(response, 'form', 'image',
+                             'Поддерживаются форматы: JPEG')
+
+    def test_not_an_image(self):
+        """Файл без заголовка картинки отклоняется"""
+        response = self.post_image(b'not an image' * 10000)
+        self.assertFormError(response, 'form', 'image',
+                             'Загрузите правильное изображение')
+
+    def upload_request(self, content):
+        return RequestFactory().post(
+            '/new/', {'text': 'текст', 'image': upload(content)})
+
+    def test_upload_memory_is_bounded(self):
+        """Память на приём загрузки не растёт вместе с размером файла"""
+        content = image_bytes((1200, 1200), noise=True)
+        self.assertGreater(len(content), 4 * 1024 * 1024)
+        request = self.upload_request(content)
+        # прогрев: ленивые импорты не должны попасть в замер
+        warm_up = self.upload_request(image_bytes())
+        PostForm(warm_up.POST, warm_up.FILES).is_valid()
+        tracemalloc.start()
+        try:
+            self.assertTrue(PostForm(request.POST, request.FILES).is_valid())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
@@ -8,6 +8,8 @@ from django.contrib.auth import get_user_model
 from django.shortcuts import reverse
 from django.test import Client, TestCase, override_settings
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from ..forms import PostForm
@@ -51,6 +53,7 @@ class ViewsTests(TestCase):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -179,16 +182,44 @@ class ViewsTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_cache(self):
-        """Проверка работы кэша"""
-        response_1 = self.guest_client.get(reverse('index'))
-        Post.objects.create(text='test2', author=self.user)
-        response_2 = self.guest_client.get(reverse('index'))
+        """Проверка работы кэша карточек"""
         cache.clear()
-        response_3 = self.guest_client.get(reverse('index'))
-        self.assertEqual(response_1.content, response_2.content,
-                         'Кэширование не работает')
-        self.assertNotEqual(response_2.content, response_3.content,
-                            'Кэш не очистился')
+        self.guest_client.get(reverse('index'))
+        Post.objects.filter(pk=self.post.pk).update(text='в обход сигналов')
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'в обход сигналов',
+                               msg_prefix='Кэширование не работает')
+
+    def test_cache_invalidation(self):
+        """Изменения поста и комментарии сразу видны в лентах"""
+        cache.clear()
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'новый текст'
+        post.save()
+        Comment.objects.create(post=post, author=self.user, text='коммент')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'новый текст')
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_cache_edit_button_only_for_author(self):
+        """Закэшированная карточка не показывает чужим кнопку правки"""
+        cache.clear()
+        edit_url = reverse('post_edit', args=[self.user.username,
+                                              self.post.id])
+        self.assertContains(self.authorized_client.get(reverse('index')),
+                            edit_url)
+        self.assertNotContains(self.guest_client.get(reverse('index')),
+                               edit_url)
 
     def test_auth_user_comment(self):
         """Проверка возможности авторизованного
@@ -296,6 +327,7 @@ class PaginatorViewTest(TestCase):
                 group=cls.group)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_paginator_first_page(self):
@@ -389,3 +421,60 @@ class FollowViewsTests(TestCase):
                                      kwargs={'username': 'author'}))
         count_following = Follow.objects.all().count()
         self.assertEqual(count_following, count_follow - 1)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ragnar')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Название',
+            slug='test-1',
+            description='Текст')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'тестовый текст{i}',
+                author=self.user,
+                group=self.group)
+            Comment.objects.create(post=post, author=self.reader,
+                                   text='комментарий')
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        return len(context.captured_queries)
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов ленты не растёт вместе с числом постов"""
+        urls = {
+            reverse('index'): self.guest_client,
+            reverse('group_posts', args=[self.group.slug]): self.guest_client,
+            reverse('profile', args=[self.user.username]): self.guest_client,
+            reverse('follow_index'): self.reader_client,
+        }
+        self.create_posts(1)
+        few = {url: self.count_queries(client, url)
+               for url, client in urls.items()}
+        self.create_posts(9)
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(client, url), few[url])
+
+    def test_feed_shows_comment_count(self):
+        """Карточка поста выводит количество комментариев"""
+        self.create_posts(1)
+        response = self.guest_client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].comments_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
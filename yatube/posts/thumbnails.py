@@ -0,0 +1,160 @@
+"""
+Миниатюры картинок постов.
+
+Миниатюры строятся один раз после сохранения поста фоновой задачей
+posts.tasks: несколько ширин (POST_THUMBNAIL_WIDTHS) с пропорциями
+POST_THUMBNAIL_SIZE в JPEG и, если Pillow собран с поддержкой, в WebP.
+URL и srcset записываются в пост, рендер ленты только подставляет их
+и не открывает картинку через Pillow. Пока миниатюр нет, карточка
+показывает исходную картинку.
+"""
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from . import metrics, pagecache, tasks
+from .cache import invalidate_cards
+from .models import Post
+
+FIELDS = ('thumbnail_url', 'thumbnail_srcset', 'thumbnail_webp_srcset')
+FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def variant_sizes(source_width):
+    """
+    Размеры вариантов. Ширины больше исходной пропускаются,
+    самая маленькая строится всегда.
+    """
+    width, height = settings.POST_THUMBNAIL_SIZE
+    widths = sorted(settings.POST_THUMBNAIL_WIDTHS)
+    widths = [widths[0]] + [w for w in widths[1:] if w <= source_width]
+    return [(w, round(w * height / width)) for w in widths]
+
+
+def thumbnail_name(post_id, image_name, size, extension):
+    """
+    Имя варианта из pk поста и полного имени картинки: у картинок
+    a.png и a.jpg или у картинок разных постов имена не совпадут.
+    """
+    return (f'thumbnails/{post_id}/{image_name}_{size[0]}x{size[1]}'
+            f'.{extension}')
+
+
+def render_variants(image_file, formats):
+    """
+    Варианты картинки с обрезкой по центру, как в прежнем шаблоне:
+    словарь {(формат, размер): байты}. Картинка поворачивается
+    по EXIF, как делал sorl (THUMBNAIL_ORIENTATION).
+    """
+    variants = {}
+    with Image.open(image_file) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size in variant_sizes(image.width):
+            fitted = ImageOps.fit(image, size, method=Image.LANCZOS)
+            for image_format in formats:
+                buffer = BytesIO()
+                fitted.save(buffer, image_format,
+                            quality=settings.THUMBNAIL_QUALITY)
+                variants[image_format, size] = buffer.getvalue()
+    return variants
+
+
+def _save(name, content):
+    # имена уникальны для поста и картинки: прежний вариант заменяется
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.url(default_storage.save(name,
+                                                    ContentFile(content)))
+
+
+def variant_names(post):
+    """Имена в хранилище вариантов из srcset поста."""
+    names = set()
+    for value in (post.thumbnail_srcset, post.thumbnail_webp_srcset):
+        for item in filter(None, value.split(', ')):
+            url = item.rsplit(' ', 1)[0]
+            if url.startswith(settings.MEDIA_URL):
+                names.add(url[len(settings.MEDIA_URL):])
+    return names
+
+
+def delete_variants(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def srcset(urls):
+    return ', '.join(f'{url} {width}w'
+                     for url, width in sorted(urls, key=lambda x: x[1]))
+
+
+def generate(post_id):
+    """
+    Строит варианты картинки поста и сохраняет их URL. Варианты
+    прежней картинки удаляются.
+    """
+    post = (Post.objects.filter(pk=post_id).only('pk', 'image', *FIELDS)
+            .first())
+    if post is None or not post.image:
+        return None
+    formats = ['JPEG']
+    if features.check('webp'):
+        formats.append('WEBP')
+    with post.image.open('rb') as image_file:
+        variants = render_variants(image_file, formats)
+    names = set()
+    srcsets = {image_format: [] for image_format in formats}
+    for (image_format, size), content in variants.items():
+        name = thumbnail_name(post.pk, post.image.name, size,
+                              FORMATS[image_format])
+        names.add(name)
+        srcsets[image_format].append((_save(name, content), size[0]))
+    jpeg = sorted(srcsets['JPEG'], key=lambda item: item[1])
+    values = {
+        'thumbnail_url': jpeg[-1][0],
+        'thumbnail_srcset': srcset(jpeg),
+        'thumbnail_webp_srcset': srcset(srcsets.get('WEBP', [])),
+    }
+    # картинку могли заменить, пока строились миниатюры
+    if not Post.objects.filter(pk=post_id,
+                               image=post.image.name).update(**values):
+        delete_variants(names)
+        return None
+    delete_variants(variant_names(post) - names)
+    invalidate_cards([post_id])
+    pagecache.purge_post(post_id)
+    return values['thumbnail_url']
+
+
+def reset(post):
+    """
+    Очищает миниатюры поста перед заменой картинки и удаляет их
+    файлы, возвращает имена изменённых полей.
+    """
+    delete_variants(variant_names(post))
+    for field in FIELDS:
+        setattr(post, field, '')
+    return list(FIELDS)
+
+
+@tasks.task
+def build(post_id):
+    started = time.perf_counter()
+    try:
+        return generate(post_id)
+    finally:
+        metrics.REGISTRY.add('yatube_thumbnails_generated_total', 1)
+        metrics.REGISTRY.add('yatube_thumbnail_seconds_total',
+                             time.perf_counter() - started)
+
+
+def schedule(post):
+    """Ставит построение миниатюр в очередь фоновых задач."""
+    if not post.image:
+        return
+    metrics.incr('thumbnails_scheduled')
+    tasks.enqueue(build, post.pk)
@@ -0,0 +1,149 @@
+"""
+Лента подписок с записью при публикации (fan-out on write).
+
+Новый пост раскладывается по TimelineEntry всех подписчиков автора
+фоновой задачей publish (posts.tasks), поэтому follow_index читает
+одну ленту пользователя по индексу (user, -pub_date), а не соединяет
+все посты со всеми подписками. Подписка и отписка тоже правят
+ленту задачами: backfill и unfollow.
+Лента ограничена TIMELINE_MAX_LENGTH записями на пользователя.
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+не раскладываются, а подмешиваются при чтении.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from . import tasks
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def is_pulled(author_id):
+    """Посты автора читаются напрямую, без раскладки по лентам."""
+    stats = AuthorStats.objects.for_user(author_id)
+    return stats.followers_count > settings.TIMELINE_FANOUT_LIMIT
+
+
+def trim(user_ids):
+    """Удаляет из лент самые старые записи сверх лимита."""
+    limit = settings.TIMELINE_MAX_LENGTH
+    overflowing = (TimelineEntry.objects.filter(user_id__in=user_ids)
+                   .order_by().values('user_id').annotate(total=Count('pk'))
+                   .filter(total__gt=limit)
+                   .values_list('user_id', flat=True))
+    for user_id in list(overflowing):
+        stale = (TimelineEntry.objects.filter(user_id=user_id)
+                 .order_by('-pub_date', '-post_id')
+                 .values_list('pk', flat=True)[limit:])
+        TimelineEntry.objects.filter(pk__in=list(stale)).delete()
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True).iterator())
+    batch = []
+    for user_id in followers:
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            _deliver(post, batch)
+            batch = []
+    if batch:
+        _deliver(post, batch)
+
+
+@tasks.task
+def publish(post_id):
+    """Задача posts.tasks: раскладка поста, который ещё существует."""
+    post = (Post.objects.filter(pk=post_id)
+            .only('author_id', 'pub_date').first())
+    if post is not None:
+        fan_out(post)
+
+
+def _deliver(post, user_ids):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post.pk,
+                       pub_date=post.pub_date) for user_id in user_ids],
+        ignore_conflicts=True)
+    trim(user_ids)
+
+
+def is_following(user_id, author_id):
+    return Follow.objects.filter(user_id=user_id,
+                                 author_id=author_id).exists()
+
+
+@tasks.task
+def backfill(user_id, author_id):
+    """
+    Задача posts.tasks: последние посты автора в ленту после подписки.
+    Задачи подписки и отписки могут выполниться не по порядку, поэтому
+    обе сверяются с текущей подпиской.
+    """
+    if is_pulled(author_id) or not is_following(user_id, author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by('-pub_date', '-pk')
+             .values_list('pk', 'pub_date')[:settings.TIMELINE_MAX_LENGTH])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    trim([user_id])
+
+
+@tasks.task
+def unfollow(user_id, author_id):
+    """Задача posts.tasks: посты автора из ленты после отписки."""
+    # проверка подписки — тем же DELETE, подзапросом
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).exclude(
+        user__follower__author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """
+    Собирает ленту пользователя заново по его подпискам: один
+    INSERT … SELECT последних постов всех авторов вместо backfill
+    по каждому автору с обрезкой после каждого.
+    """
+    authors = (Follow.objects.filter(user_id=user_id)
+               .exclude(author__stats__followers_count__gt=(
+                   settings.TIMELINE_FANOUT_LIMIT))
+               .values('author_id'))
+    posts = (Post.objects.filter(author_id__in=authors)
+             .order_by('-pub_date', '-pk')
+             .values_list('pk', 'pub_date')[:settings.TIMELINE_MAX_LENGTH])
+    sql, params = posts.query.sql_with_params()
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) SELECT %s, * FROM ({sql})',
+            [user_id, *params])
+
+
+def posts_for(user):
+    """
+    Посты ленты подписок. Обычно это один проход по индексу
+    (user, -pub_date) ленты пользователя; если пользователь подписан
+    на авторов, чьи посты не раскладываются, они подмешиваются
+    отдельным условием.
+    """
+    pulled = list(
+        AuthorStats.objects
+        .filter(user__following__user=user,
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list('user_id', flat=True))
+    if not pulled:
+        return (Post.objects.feed().filter(timeline_entries__user=user)
+                .annotate(feed_date=F('timeline_entries__pub_date'))
+                .order_by('-feed_date', '-pk'))
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.feed().filter(
+        Q(pk__in=entries) | Q(author_id__in=pulled))
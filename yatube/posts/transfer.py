@@ -0,0 +1,206 @@
+"""
+Массовый импорт и экспорт групп, постов, комментариев и подписок.
+
+Данные идут потоком записей-словарей с ключом model (group, post,
+comment, follow) в формате JSONL или CSV. Экспорт читает таблицы
+итератором, импорт копит записи пачками по batch_size и сохраняет их
+bulk_create без сигналов, поэтому память не зависит от размера файла.
+Авторы и группы ищутся по username и slug в словарях в памяти,
+отсутствующие пользователи создаются. Счётчики, ленты подписок
+и поисковый индекс после импорта пересобираются командами
+rebuild_counters, rebuild_timelines и rebuild_search_index.
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_cards, invalidate_feeds
+from .models import Comment, Follow, Group, Post, User
+
+MODELS = ('group', 'post', 'comment', 'follow')
+FIELDS = {
+    'group': ('title', 'slug', 'description'),
+    'post': ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+    'comment': ('post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+CSV_FIELDS = ['model'] + list(dict.fromkeys(
+    field for fields in FIELDS.values() for field in fields))
+
+
+def export_records(models=MODELS, batch_size=1000):
+    """Записи для экспорта: группы, посты, комментарии, подписки."""
+    querysets = {
+        'group': Group.objects.values_list(*FIELDS['group']),
+        'post': Post.objects.values_list(
+            'id', 'text', 'pub_date', 'author__username', 'group__slug',
+            'image'),
+        'comment': Comment.objects.values_list(
+            'post_id', 'author__username', 'text', 'created'),
+        'follow': Follow.objects.values_list('user__username',
+                                             'author__username'),
+    }
+    for model in MODELS:
+        if model not in models:
+            continue
+        queryset = querysets[model].order_by('pk')
+        for row in queryset.iterator(chunk_size=batch_size):
+            record = dict(zip(FIELDS[model], row), model=model)
+            for field in ('pub_date', 'created'):
+                if field in record:
+                    record[field] = record[field].isoformat()
+            yield record
+
+
+def write_jsonl(records, stream):
+    total = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        total += 1
+    return total
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_csv(records, stream):
+    writer = csv.DictWriter(stream, CSV_FIELDS)
+    writer.writeheader()
+    total = 0
+    for record in records:
+        writer.writerow(record)
+        total += 1
+    return total
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        model = row['model']
+        record = {field: row.get(field) or None
+                  for field in FIELDS.get(model, ())}
+        record['model'] = model
+        yield record
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+@contextmanager
+def keep_dates():
+    """Даты из файла вместо auto_now_add в bulk_create."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """
+    Сохраняет поток записей пачками. Перед сохранением пачки
+    сохраняются все пачки, от которых она зависит: пользователи
+    и группы раньше постов, посты раньше комментариев.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.new_users = set()
+        self.pending = {model: [] for model in MODELS}
+        self.counts = dict.fromkeys(MODELS, 0)
+
+    def add(self, record):
+        model = record.get('model')
+        if model not in self.pending:
+            raise ValueError(f'Неизвестная модель: {model}')
+        for field in ('author', 'user'):
+            username = record.get(field)
+            if username and username not in self.users:
+                self.users[username] = None
+                self.new_users.add(username)
+        self.pending[model].append(record)
+        if (len(self.pending[model]) >= self.batch_size
+                or len(self.new_users) >= self.batch_size):
+            self.flush()
+
+    def flush(self):
+        self._create_users()
+        for model in MODELS:
+            records = self.pending[model]
+            if records:
+                getattr(self, f'_create_{model}s')(records)
+                self.counts[model] += len(records)
+                self.pending[model] = []
+
+    def _create_users(self):
+        if not self.new_users:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=username, password=password)
+             for username in self.new_users])
+        self.users.update(User.objects.filter(
+            username__in=self.new_users).values_list('username', 'pk'))
+        self.new_users = set()
+
+    def _create_groups(self, records):
+        Group.objects.bulk_create(
+            [Group(title=record['title'], slug=record['slug'],
+                   description=record.get('description') or '')
+             for record in records],
+            ignore_conflicts=True)
+        slugs = [record['slug'] for record in records]
+        self.groups.update(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+
+    def _create_posts(self, records):
+        Post.objects.bulk_create([
+            Post(id=record.get('id'), text=record['text'],
+                 pub_date=parse_date(record.get('pub_date')),
+                 author_id=self.users[record['author']],
+                 group_id=self.groups.get(record.get('group')),
+                 image=record.get('image') or '')
+            for record in records])
+
+    def _create_comments(self, records):
+        Comment.objects.bulk_create([
+            Comment(post_id=record['post'], text=record['text'],
+                    author_id=self.users[record['author']],
+                    created=parse_date(record.get('created')))
+            for record in records])
+        invalidate_cards({record['post'] for record in records})
+
+    def _create_follows(self, records):
+        Follow.objects.bulk_create(
+            [Follow(user_id=self.users[record['user']],
+                    author_id=self.users[record['author']])
+             for record in records if record['user'] != record['author']],
+            ignore_conflicts=True)
+
+    def run(self, records):
+        with keep_dates():
+            for record in records:
+                self.add(record)
+            self.flush()
+        invalidate_feeds()
+        return self.counts
@@ -0,0 +1,126 @@
+"""
+Потоковый приём картинок постов.
+
+ImageUploadHandler пишет загрузку кусками во временный файл и ещё до
+конца передачи проверяет её размер, а по заголовку — формат и размеры
+в пикселях. Отклонённая загрузка дальше не сохраняется, форма получает
+RejectedUpload с текстом ошибки. Пиксели при проверке не декодируются,
+поэтому память на одну загрузку ограничена размером куска.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+HEADER_SIZE = 64 * 1024
+INVALID_IMAGE = 'Загрузите правильное изображение'
+
+
+class RejectedUpload(UploadedFile):
+    """Загрузка, отклонённая до конца передачи."""
+
+    def __init__(self, name, error):
+        super().__init__(file=BytesIO(), name=name, size=0)
+        self.upload_error = error
+
+
+def check_size(size):
+    limit = settings.POST_IMAGE_MAX_BYTES
+    if size > limit:
+        return f'Файл больше {filesizeformat(limit)}'
+    return None
+
+
+def read_header(image_file):
+    """
+    Формат и размеры картинки. Image.open читает только заголовок,
+    пиксели не декодируются.
+    """
+    with Image.open(image_file) as image:
+        return image.format, image.size
+
+
+def check_header(image_format, size):
+    """Текст ошибки для формата и размеров картинки или None."""
+    if image_format not in settings.POST_IMAGE_FORMATS:
+        formats = ', '.join(settings.POST_IMAGE_FORMATS)
+        return f'Поддерживаются форматы: {formats}'
+    width, height = size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return f'Слишком большое изображение: {width}x{height}'
+    return None
+
+
+def check_image(image_file):
+    try:
+        return check_header(*read_header(image_file))
+    except Image.DecompressionBombError:
+        return 'Слишком большое изображение'
+    except Exception:
+        return INVALID_IMAGE
+
+
+def upload_error(uploaded_file):
+    """
+    Текст ошибки загруженной картинки или None: ошибка потоковой
+    проверки или та же проверка для файлов, принятых без неё.
+    """
+    if hasattr(uploaded_file, 'upload_error'):
+        return uploaded_file.upload_error
+    error = check_size(uploaded_file.size) or check_image(uploaded_file)
+    uploaded_file.seek(0)
+    return error
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.checked = False
+        self.error = None
+
+    def reject(self, error):
+        self.error = error
+        self.file.close()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        error = check_size(start + len(raw_data))
+        if not error and not self.checked:
+            error = self.check_start(raw_data)
+        if error:
+            self.reject(error)
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def check_start(self, raw_data):
+        """Проверка по первым HEADER_SIZE байтам загрузки."""
+        self.header += raw_data[:HEADER_SIZE - len(self.header)]
+        if len(self.header) < HEADER_SIZE:
+            return None
+        try:
+            header = read_header(BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.checked = True
+            return 'Слишком большое изображение'
+        except Exception:
+            # заголовок не поместился (например, большой EXIF у JPEG),
+            # проверка повторится по файлу целиком
+            return None
+        self.checked = True
+        return check_header(*header)
+
+    def file_complete(self, file_size):
+        if not self.error and not self.checked:
+            self.file.seek(0)
+            error = check_image(self.file)
+            if error:
+                self.reject(error)
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        return super().file_complete(file_size)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('404/', views.page_not_found, name='404'),
@@ -8,7 +8,18 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search, name='search'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('metrics/slow/', views.slow_queries, name='slow_queries'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/groups/<slug:slug>/posts/', api.group_posts,
+         name='api_group_posts'),
+    path('api/v1/follow/', api.follow_index, name='api_follow_index'),
+    path('api/v1/users/<str:username>/posts/', api.profile,
+         name='api_profile'),
+    path('api/v1/users/<str:username>/posts/<int:post_id>/', api.post_view,
+         name='api_post'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/',
@@ -1,69 +1,95 @@
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.views.decorators.http import condition
 
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from . import conditional, thumbnails, timeline
+from .concurrent import fetch, gather
 from .forms import PostForm, CommentForm
+from .metrics import REGISTRY
+from .pagecache import cache_for_guests
+from .paginator import paginate
+from .routers import read_only
+from .search import SearchResults
+from .slowlog import SLOW_QUERIES
 
 
+@read_only
+@cache_for_guests('index')
+@condition(etag_func=conditional.index_etag)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, Post.objects.feed(), cache_key='feed:index')
     return render(request, 'index.html', {'page': page})
 
 
+@read_only
+@cache_for_guests('group:{slug}')
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, group.posts.feed(),
+                    cache_key=f'feed:group:{group.pk}')
     return render(request, 'group.html', {
         'group': group, 'page': page})
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = paginate(request, SearchResults(query), cursor=False)
+    # совпадений дальше SEARCH_MAX_RESULTS поиск не считает
+    capped = page.paginator.count >= settings.SEARCH_MAX_RESULTS
+    return render(request, 'search.html', {'query': query, 'page': page,
+                                           'capped': capped})
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # задачи posts.tasks ставятся в очередь вместе с постом
+        with transaction.atomic():
+            post.save()
+            thumbnails.schedule(post)
         return redirect('index')
     return render(request, 'new.html', {'form': form})
 
 
+@read_only
+@cache_for_guests('author:{username}', 'groups')
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    posts = user.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user
-        ).exists()
-    return render(request, 'profile.html', {'author': user, 'page': page,
-                  'paginator': paginator, 'following': following})
-
-
+    # счётчики и подписку уже прочитал profile_etag
+    page, (stats, following) = gather(
+        lambda: paginate(request, user.posts.feed(),
+                         cache_key=f'feed:profile:{user.pk}'),
+        lambda: conditional.author_state(request, user.pk))
+    return render(request, 'profile.html', {
+        'author': user, 'stats': stats,
+        'page': page, 'paginator': page.paginator,
+        'following': following})
+
+
+@read_only
+@cache_for_guests('author:{username}', 'post:{post_id}', 'groups')
+@condition(etag_func=conditional.post_etag)
 def post_view(request, username, post_id):
     user = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post, comments, (stats, following) = gather(
+        lambda: get_object_or_404(Post.objects.feed(), id=post_id,
+                                  author=user),
+        lambda: fetch(Comment.objects.filter(post_id=post_id)
+                      .select_related('author')),
+        lambda: conditional.author_state(request, user.pk))
     form = CommentForm()
-    comments = post.comments.all()
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user
-        ).exists()
     return render(request, 'post.html', {
-        'author': post.author, 'post': post,
+        'author': post.author, 'stats': stats,
+        'post': post,
         'form': form, 'comments': comments, 'following': following})
 
 
@@ -76,7 +102,15 @@ def post_edit(request, username, post_id):
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        fields = ['text', 'group', 'image']
+        if 'image' in form.changed_data:
+            fields.extend(thumbnails.reset(post))
+        # счётчик комментариев меняется в обход формы и не перезаписывается
+        with transaction.atomic():
+            post.save(update_fields=fields)
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
         return redirect('post', username=username,
                         post_id=post_id)
     return render(request, 'new.html',
@@ -92,18 +126,17 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('post', username=username, post_id=post_id)
 
 
 @login_required
+@read_only
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, timeline.posts_for(request.user))
     return render(request, 'follow.html',
-                  {'paginator': paginator, 'page': page})
+                  {'paginator': page.paginator, 'page': page})
 
 
 @login_required
@@ -117,10 +150,30 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('profile', username=username)
 
 
+def check_metrics_access(request):
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR')
+            in settings.METRICS_ALLOWED_IPS):
+        raise Http404
+
+
+def metrics(request):
+    """Счётчики posts.metrics процесса в текстовом формате Prometheus."""
+    check_metrics_access(request)
+    return HttpResponse(REGISTRY.render(),
+                        content_type='text/plain; version=0.0.4')
+
+
+def slow_queries(request):
+    """Самые дорогие медленные запросы процесса, см. posts.slowlog."""
+    check_metrics_access(request)
+    return HttpResponse(SLOW_QUERIES.render(),
+                        content_type='text/plain; charset=utf-8')
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -0,0 +1,163 @@
+"""
+Точка входа ASGI, например: uvicorn yatube.asgi:application
+
+В Django 2.2 нет обработчика ASGI (django.core.asgi появился в 3.0),
+поэтому WsgiToAsgi выполняет приложение WSGI в пуле из ASGI_THREADS
+потоков, а тело запроса принимает и ответ отправляет в цикле
+событий. Медленный клиент занимает корутину, а не поток Django:
+поток освобождается, как только ответ готов. Ответ целиком
+собирается в памяти, поэтому потоковые ответы и файлы отдаёт
+веб-сервер, а не это приложение.
+
+Тело запроса копится во временном файле, который уходит на диск
+после FILE_UPLOAD_MAX_MEMORY_SIZE байт. Запрос длиннее
+ASGI_MAX_BODY_BYTES получает 413, не дочитываясь до конца: по
+заголовку Content-Length или, без него, по уже принятым байтам.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+class RequestTooLarge(Exception):
+    """Тело запроса больше ASGI_MAX_BODY_BYTES."""
+
+
+def content_length(scope):
+    for name, value in scope['headers']:
+        if name.lower() == b'content-length' and value.isdigit():
+            return int(value)
+    return 0
+
+
+def wsgi_environ(scope, body):
+    """Окружение WSGI (PEP 3333) для запроса ASGI, body — файл тела."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип: {scope["type"]}')
+        try:
+            body = await self.read_body(scope, receive)
+        except RequestTooLarge:
+            return await self.reject(send, 413, b'Request body too large')
+        if body is None:
+            return
+        with body:
+            status, headers, chunks = await asyncio.get_running_loop(
+            ).run_in_executor(self.executor, self.run,
+                              wsgi_environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def read_body(self, scope, receive):
+        """Файл с телом запроса или None, если клиент ушёл."""
+        limit = settings.ASGI_MAX_BODY_BYTES
+        if content_length(scope) > limit:
+            raise RequestTooLarge
+        body = tempfile.SpooledTemporaryFile(
+            settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > limit:
+                body.close()
+                raise RequestTooLarge
+            body.write(chunk)
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+
+    async def reject(self, send, status, text):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type',
+                                 b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': text})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def run(self, environ):
+        """Выполняет приложение WSGI, возвращает статус, заголовки, тело."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            chunks = [chunk for chunk in result if chunk]
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], chunks
+
+
+def get_asgi_application():
+    wsgi_application = get_wsgi_application()
+    return WsgiToAsgi(wsgi_application, settings.ASGI_THREADS)
+
+
+application = get_asgi_application()
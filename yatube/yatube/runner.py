@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Фоновые задачи posts.tasks в тестах выполняются сразу, как письма
+    уходят в locmem: TestCase не вызывает on_commit, воркеров нет.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.saved_tasks = settings.TASKS
+        settings.TASKS = {**settings.TASKS, 'BACKEND': 'eager'}
+
+    def teardown_test_environment(self, **kwargs):
+        settings.TASKS = self.saved_tasks
+        super().teardown_test_environment(**kwargs)
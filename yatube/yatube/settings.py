@@ -49,6 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.PerformanceMiddleware',
+    'posts.middleware.SlowQueryMiddleware',
+    'posts.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +66,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -91,6 +94,65 @@ DATABASES = {
     }
 }
 
+# Соединения с базой между запросами (posts.db, YATUBE_DB_CONNECTIONS).
+# persistent: соединение живёт до 10 минут и переиспользуется потоком;
+# pooled: для серверной базы за внешним пулом вроде PgBouncer
+# в режиме transaction — соединение не закрывается, а серверные
+# курсоры, которые пул не поддерживает, выключены.
+DATABASE_CONNECTION_PRESETS = {
+    'off': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 600},
+    'pooled': {'CONN_MAX_AGE': None, 'DISABLE_SERVER_SIDE_CURSORS': True},
+}
+DATABASE_CONNECTION = DATABASE_CONNECTION_PRESETS[
+    os.environ.get('YATUBE_DB_CONNECTIONS', 'persistent')]
+DATABASES['default'].update(DATABASE_CONNECTION)
+# В начале каждого запроса открытые соединения проверяются,
+# неработающие закрываются, и первый запрос к базе откроет новое
+DATABASE_HEALTH_CHECKS = True
+
+# Настройка каждого нового соединения с SQLite (posts.db).
+# production: журнал WAL, чтобы чтение не ждало запись, ожидание
+# блокировки вместо «database is locked», mmap и кэш страниц побольше;
+# транзакции atomic() сразу берут блокировку записи (BEGIN IMMEDIATE).
+SQLITE_PRESETS = {
+    'default': {'PRAGMAS': {}, 'TRANSACTION_MODE': None},
+    'production': {
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            # отрицательное значение — размер в КиБ, а не в страницах
+            'cache_size': -32000,
+        },
+        'TRANSACTION_MODE': 'IMMEDIATE',
+    },
+}
+SQLITE = SQLITE_PRESETS[os.environ.get('YATUBE_SQLITE', 'production')]
+
+# Реплики только для чтения (posts.routers), например
+# YATUBE_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3.
+# В тестах реплики — зеркала тестовой базы default.
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+        **DATABASE_CONNECTION,
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы
+REPLICA_PIN_SECONDS = 15
+
+# Потоки для параллельных выборок в представлениях (posts.concurrent),
+# 0 — выборки идут последовательно
+VIEW_LOOKUP_THREADS = 4
+# Потоки, в которых yatube.asgi выполняет Django
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,8 +207,102 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
+# Кэш выбирается переменной окружения YATUBE_CACHE. locmem у каждого
+# воркера свой; file и memcached общие для всех процессов сервера.
+# Блокировку пересчёта лент (posts.cache.cached) атомарно берёт только
+# memcached: у file add — проверка и запись отдельно, и пересчитывать
+# горячий ключ изредка начнут сразу несколько процессов.
+# memcached требует пакета python-memcached.
+CACHE_PRESETS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   os.path.join(BASE_DIR, 'cache')),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   '127.0.0.1:11211'),
+    },
+}
+CACHES = {
+    'default': CACHE_PRESETS[os.environ.get('YATUBE_CACHE', 'locmem')],
+}
+
+# Пагинация лент
+POSTS_PER_PAGE = 10
+# True — лента листается по курсору (?cursor=) без COUNT(*) и OFFSET
+POSTS_CURSOR_PAGINATION = False
+
+# Лента подписок: сколько постов хранится в ленте пользователя
+TIMELINE_MAX_LENGTH = 1000
+# посты авторов с большим числом подписчиков подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 5000
+
+# Страницы лент и постов для гостей (posts.pagecache): сколько секунд
+# страница живёт в кэше приложения, который сбрасывается при изменениях,
+# и сколько её держит обратный прокси (s-maxage), который не сбрасывается.
+# PAGE_CACHE_TIMEOUT = 0 выключает кэш страниц
+PAGE_CACHE_TIMEOUT = 300
+PAGE_CACHE_PROXY_SECONDS = 10
+
+# Карточки постов сбрасываются сигналами, TTL только страхует от мусора
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы лент (число постов и id на странице) в общем кэше.
+# После FEED_CACHE_TIMEOUT значение ещё FEED_CACHE_STALE секунд отдаётся
+# устаревшим, пока один процесс его пересчитывает.
+FEED_CACHE_TIMEOUT = 20
+FEED_CACHE_STALE = 60
+# Сколько секунд ждать чужого пересчёта холодного ключа
+FEED_CACHE_LOCK_TIMEOUT = 5
+
+# Миниатюры картинок постов строятся фоновой задачей после сохранения
+POST_THUMBNAIL_SIZE = (1000, 500)
+# ширины вариантов для srcset, пропорции как у POST_THUMBNAIL_SIZE
+POST_THUMBNAIL_WIDTHS = (400, 700, 1000)
+THUMBNAIL_QUALITY = 85
+
+# Фоновые задачи (posts.tasks). BACKEND: database — очередь в таблице
+# posts_task, которую разбирает manage.py run_workers; thread — пул
+# потоков веб-процесса после коммита, повторы тоже в процессе, без
+# run_workers, но теряются при его остановке; eager — сразу, внутри
+# запроса.
+TASKS = {
+    'BACKEND': os.environ.get('YATUBE_TASKS', 'thread'),
+    'THREADS': 2,
+    # процессы manage.py run_workers по умолчанию
+    'PROCESSES': 2,
+    'MAX_ATTEMPTS': 5,
+    # задержка перед повтором, удваивается с каждой попыткой, секунды
+    'RETRY_DELAY': 10,
+    # через сколько секунд задачу зависшего воркера заберёт другой
+    'LOCK_SECONDS': 300,
+    # как часто воркер опрашивает пустую очередь, секунды
+    'POLL_INTERVAL': 1,
 }
+# В тестах задачи выполняются сразу (eager)
+TEST_RUNNER = 'yatube.runner.TestRunner'
+
+# Загрузки пишутся на диск кусками и проверяются до конца передачи
+FILE_UPLOAD_HANDLERS = ['posts.uploads.ImageUploadHandler']
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+# Тело запроса длиннее получает от yatube.asgi ответ 413:
+# картинка поста и остальные поля формы
+ASGI_MAX_BODY_BYTES = POST_IMAGE_MAX_BYTES + 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Поиск ранжирует не больше стольких самых новых совпадений
+SEARCH_MAX_RESULTS = 1000
+
+# Доля запросов, для которых собираются метрики (posts.metrics)
+METRICS_SAMPLE_RATE = 0.05
+# Кроме персонала, /metrics/ доступна с этих адресов. За обратным
+# прокси у всех запросов его адрес, поэтому по умолчанию — никому
+METRICS_ALLOWED_IPS = []
+# Запросы дольше порога пишутся в журнал posts.slowlog, None — выключено
+SLOW_QUERY_THRESHOLD_MS = 100